@@ -0,0 +1,138 @@
+# api_snapshots.py
+# ======================
+# Precomputed snapshots for the read-only JSON API
+# ======================
+# The bot publishes plain-Python snapshots (XP leaderboard, KD standings,
+# per-user profiles, tournament rosters) every minute. Each rendered
+# response (one page of a list, or one profile) is serialised, gzipped
+# and ETag'd once per snapshot version and then served from memory by
+# the Flask keepalive thread, so requests never touch the Discord gateway
+# or fortnite-api.com. The ETag covers the data only (the snapshot time
+# goes in a header), so unchanged data keeps its ETag across publishes.
+# A per-IP token bucket limits request rates.
+
+import gzip
+import json
+import time
+import hashlib
+import threading
+from collections import OrderedDict
+
+MAX_PER_PAGE = 100
+DEFAULT_PER_PAGE = 25
+
+
+class Rendered:
+    __slots__ = ("body", "gzipped", "etag", "generated_at")
+
+    def __init__(self, payload, generated_at: int):
+        self.generated_at = generated_at
+        self.body = json.dumps(payload, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+        self.gzipped = gzip.compress(self.body, compresslevel=6)
+        self.etag = hashlib.sha1(self.body).hexdigest()[:20]   # unquoted entity tag
+
+
+class Snapshot:
+    __slots__ = ("name", "version", "generated_at", "items", "index")
+
+    def __init__(self, name, items, index=None):
+        self.name = name
+        self.items = items            # list for paginated endpoints
+        self.index = index or {}      # key -> item for lookup endpoints
+        self.generated_at = int(time.time())
+        self.version = f"{self.generated_at}-{id(self)}"
+
+
+class SnapshotStore:
+    def __init__(self, render_cache_size: int = 2048):
+        self._snapshots = {}
+        self._rendered = OrderedDict()   # (name, version, key) -> Rendered
+        self._cache_size = render_cache_size
+        self._lock = threading.Lock()
+
+    def publish(self, name: str, items: list | None = None, index: dict | None = None):
+        """Swap in a new snapshot (called from the bot's event loop)."""
+        self._snapshots[name] = Snapshot(name, items or [], index)
+
+    def get(self, name: str) -> Snapshot | None:
+        return self._snapshots.get(name)
+
+    def _render(self, snap: Snapshot, key, build) -> Rendered:
+        cache_key = (snap.name, snap.version, key)
+        with self._lock:
+            hit = self._rendered.get(cache_key)
+            if hit is not None:
+                self._rendered.move_to_end(cache_key)
+                return hit
+        rendered = Rendered(build(), snap.generated_at)
+        with self._lock:
+            self._rendered[cache_key] = rendered
+            while len(self._rendered) > self._cache_size:
+                self._rendered.popitem(last=False)
+        return rendered
+
+    def page(self, name: str, page: int = 1, per_page: int = DEFAULT_PER_PAGE) -> Rendered | None:
+        snap = self.get(name)
+        if snap is None:
+            return None
+        per_page = max(1, min(per_page, MAX_PER_PAGE))
+        page = max(1, page)
+
+        def build():
+            start = (page - 1) * per_page
+            total = len(snap.items)
+            return {
+                "page": page,
+                "per_page": per_page,
+                "total": total,
+                "pages": (total + per_page - 1) // per_page,
+                "items": snap.items[start:start + per_page],
+            }
+        return self._render(snap, ("page", page, per_page), build)
+
+    def lookup(self, name: str, key: str) -> Rendered | None:
+        snap = self.get(name)
+        if snap is None or key not in snap.index:
+            return None
+        return self._render(snap, ("key", key), lambda: snap.index[key])
+
+
+class RateLimiter:
+    """Per-IP token bucket: `rate` requests/second, bursts up to `burst`."""
+
+    def __init__(self, rate: float = 2.0, burst: int = 30, max_clients: int = 10000):
+        self.rate = rate
+        self.burst = burst
+        self.max_clients = max_clients
+        self._buckets = {}    # ip -> [tokens, last_ts]
+        self._lock = threading.Lock()
+        self.rejected = 0
+
+    def allow(self, ip: str, now: float | None = None) -> bool:
+        now = now if now is not None else time.monotonic()
+        with self._lock:
+            bucket = self._buckets.get(ip)
+            if bucket is None:
+                if len(self._buckets) >= self.max_clients:
+                    self._evict(now)
+                bucket = self._buckets[ip] = [float(self.burst), now]
+            tokens = min(self.burst, bucket[0] + (now - bucket[1]) * self.rate)
+            bucket[1] = now
+            if tokens < 1:
+                bucket[0] = tokens
+                self.rejected += 1
+                return False
+            bucket[0] = tokens - 1
+            return True
+
+    def _evict(self, now):
+        # Drop clients whose bucket has fully refilled (idle long enough)
+        idle = self.burst / self.rate
+        for ip in [ip for ip, (_, ts) in self._buckets.items() if now - ts > idle]:
+            del self._buckets[ip]
+        if len(self._buckets) >= self.max_clients:
+            self._buckets.clear()
+
+
+snapshots = SnapshotStore()
+rate_limiter = RateLimiter()
@@ -0,0 +1,80 @@
+# bench_memory.py
+# ======================
+# Memory benchmark for per-member state
+# ======================
+# Usage: python bench_memory.py [members]
+# Builds synthetic guild state and reports bytes per member (tracemalloc)
+# for the legacy string-keyed dicts vs the slotted MemberStore.
+
+import sys
+import random
+import tracemalloc
+from datetime import date
+
+from member_store import MemberStore
+
+
+def _synthetic(n: int, seed: int = 96):
+    rng = random.Random(seed)
+    base = 900_000_000_000_000_000
+    rows = []
+    for i in range(n):
+        uid = base + rng.randrange(10 ** 17)
+        rows.append((
+            uid,
+            rng.randrange(0, 12_000),
+            f"player_{i}" if rng.random() < 0.4 else None,
+            f"20{rng.randrange(0, 15):02d}-{rng.randrange(1, 13):02d}-{rng.randrange(1, 29):02d}"
+            if rng.random() < 0.3 else None,
+            date(2026, 1, 1 + rng.randrange(28)).isoformat() if rng.random() < 0.5 else None,
+        ))
+    return rows
+
+
+def build_legacy(rows):
+    xp, epic, bdays, daily = {}, {}, {}, {}
+    for uid, x, e, b, d in rows:
+        key = str(uid)
+        xp[key] = x
+        if e:
+            epic[str(uid)] = e
+        if b:
+            bdays[str(uid)] = b
+        if d:
+            daily[str(uid)] = d
+    return xp, epic, bdays, daily
+
+
+def build_store(rows):
+    store = MemberStore(path="")
+    for uid, x, e, b, d in rows:
+        m = store.ensure(uid)
+        m.xp = x
+        m.epic = e
+        m.birthday = b
+        if d:
+            m.daily_claim = date.fromisoformat(d).toordinal()
+    return store
+
+
+def measure(builder, rows) -> int:
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    state = builder(rows)
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    size = sum(stat.size_diff for stat in after.compare_to(before, "filename"))
+    del state
+    return size
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 50_000
+    rows = _synthetic(n)
+    for label, builder in (("legacy dicts", build_legacy), ("MemberStore", build_store)):
+        size = measure(builder, rows)
+        print(f"{label:<14} {size / 1024 / 1024:8.2f} MiB  {size / n:7.1f} B/member  ({n} members)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,231 @@
+# calendar_engine.py
+# ======================
+# Date-indexed calendar for birthdays, Winterfest, QOTD and custom events
+# ======================
+# Events are bucketed by (month, day) (plus a "daily" bucket), each with a
+# local hour and timezone. The runner asks next_wake() for the exact next
+# fire instant and sleeps until then; due() only looks at the buckets
+# around today, so the daily cost is O(events today). Fired occurrences
+# are recorded per event id + local date, so reruns never double-fire.
+
+import os
+import json
+import asyncio
+from datetime import date, datetime, time, timedelta, timezone
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+from storage import save_json
+
+CALENDAR_FILE = "data/calendar.json"
+DAILY = None   # month/day value for events that recur every day
+
+
+def get_zone(name: str | None):
+    if not name:
+        return timezone.utc
+    try:
+        return ZoneInfo(name)
+    except (ZoneInfoNotFoundError, ValueError):
+        return timezone.utc
+
+
+def is_valid_zone(name: str) -> bool:
+    try:
+        ZoneInfo(name)
+        return True
+    except (ZoneInfoNotFoundError, ValueError):
+        return False
+
+
+class CalendarEvent:
+    __slots__ = ("id", "kind", "month", "day", "hour", "tz", "payload")
+
+    def __init__(self, id: str, kind: str, month: int | None, day: int | None,
+                 hour: int = 0, tz: str | None = None, payload: dict | None = None):
+        self.id = id
+        self.kind = kind
+        self.month = month
+        self.day = day
+        self.hour = hour
+        self.tz = tz
+        self.payload = payload or {}
+
+    def to_dict(self) -> dict:
+        return {name: getattr(self, name) for name in self.__slots__}
+
+    def fire_time(self, local_day: date) -> datetime:
+        """UTC instant of this event on the given local date."""
+        local = datetime.combine(local_day, time(self.hour), tzinfo=get_zone(self.tz))
+        return local.astimezone(timezone.utc)
+
+
+def _is_leap(year: int) -> bool:
+    return year % 4 == 0 and (year % 100 != 0 or year % 400 == 0)
+
+
+class Calendar:
+    def __init__(self, path: str = CALENDAR_FILE, grace: int = 24 * 3600):
+        self.path = path
+        self.grace = timedelta(seconds=grace)  # how late a missed event may still fire
+        self.events = {}      # id -> CalendarEvent
+        self.by_day = {}      # (month, day) -> {id: CalendarEvent}
+        self.daily = {}       # id -> CalendarEvent (every day)
+        self.fired = {}       # id -> ISO local date of the last fired occurrence
+        self.custom = set()   # ids persisted in the calendar file
+        self.changed = asyncio.Event()
+        self.handlers = {}    # kind -> async handler(event, local_day)
+        self.load()
+
+    # ---------- persistence ----------
+    def load(self):
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, "r") as f:
+            blob = json.load(f)
+        self.fired = blob.get("fired", {})
+        for raw in blob.get("custom", []):
+            self.add(CalendarEvent(**raw), persist=True)
+
+    def save(self):
+        save_json(self.path, {
+            "fired": self.fired,
+            "custom": [self.events[i].to_dict() for i in sorted(self.custom) if i in self.events],
+        })
+
+    # ---------- index ----------
+    def add(self, event: CalendarEvent, persist: bool = False):
+        self.remove(event.id, save=False)
+        self.events[event.id] = event
+        if event.month is DAILY:
+            self.daily[event.id] = event
+        else:
+            self.by_day.setdefault((event.month, event.day), {})[event.id] = event
+        if persist:
+            self.custom.add(event.id)
+        self.changed.set()
+
+    def remove(self, event_id: str, save: bool = True):
+        event = self.events.pop(event_id, None)
+        if event is None:
+            return
+        if event.month is DAILY:
+            self.daily.pop(event_id, None)
+        else:
+            bucket = self.by_day.get((event.month, event.day), {})
+            bucket.pop(event_id, None)
+            if not bucket:
+                self.by_day.pop((event.month, event.day), None)
+        if event_id in self.custom:
+            self.custom.discard(event_id)
+            if save:
+                self.save()
+        self.changed.set()
+
+    def on(self, kind: str):
+        """Decorator registering the async handler for an event kind."""
+        def wrap(fn):
+            self.handlers[kind] = fn
+            return fn
+        return wrap
+
+    def events_on(self, local_day: date):
+        """Events whose local date is `local_day` (Feb 29 folds onto Feb 28)."""
+        yield from self.daily.values()
+        yield from self.by_day.get((local_day.month, local_day.day), {}).values()
+        if local_day.month == 2 and local_day.day == 28 and not _is_leap(local_day.year):
+            yield from self.by_day.get((2, 29), {}).values()
+
+    # ---------- scheduling ----------
+    def due(self, now: datetime) -> list[tuple[CalendarEvent, date]]:
+        """Occurrences whose fire time has passed (within grace) and haven't fired."""
+        out = []
+        today = now.date()
+        for offset in (-1, 0, 1):   # timezones put local dates within a day of UTC
+            local_day = today + timedelta(days=offset)
+            for event in self.events_on(local_day):
+                if self.fired.get(event.id) == local_day.isoformat():
+                    continue
+                at = event.fire_time(local_day)
+                if at <= now < at + self.grace:
+                    out.append((event, local_day))
+        out.sort(key=lambda pair: pair[0].fire_time(pair[1]))
+        return out
+
+    def next_wake(self, now: datetime) -> datetime | None:
+        """Exact UTC instant of the next unfired occurrence, or None if empty."""
+        if not self.events:
+            return None
+        best = None
+        start = now.date() - timedelta(days=1)
+        for offset in range(368):
+            local_day = start + timedelta(days=offset)
+            if best is not None and datetime.combine(local_day, time(), tzinfo=timezone.utc) - timedelta(days=1) > best:
+                break
+            for event in self.events_on(local_day):
+                if self.fired.get(event.id) == local_day.isoformat():
+                    continue
+                at = event.fire_time(local_day)
+                if at > now and (best is None or at < best):
+                    best = at
+        return best
+
+    def mark_fired(self, event: CalendarEvent, local_day: date):
+        self.fired[event.id] = local_day.isoformat()
+        self.save()
+
+    @staticmethod
+    async def _report(on_error, event, error):
+        """Pass a failure to on_error; a failing error handler is printed, never raised."""
+        if on_error is None:
+            return
+        try:
+            await on_error(event, error)
+        except Exception as e:
+            print(f"⚠️ Calendar error handler failed for {event.id}: {e}")
+
+    async def run_due(self, now: datetime | None = None, on_error=None) -> int:
+        """Fire every due occurrence once. Returns how many fired."""
+        now = now or datetime.now(timezone.utc)
+        count = 0
+        for event, local_day in self.due(now):
+            handler = self.handlers.get(event.kind)
+            if handler is None:
+                continue
+            # An overlapping run (/health, /backscan) may have fired it while
+            # this one was awaiting an earlier handler
+            if self.fired.get(event.id) == local_day.isoformat():
+                continue
+            # Record first: a crash mid-handler must not re-award on the next run.
+            # fired is updated before the save, so a failed write still blocks
+            # a second fire in this process.
+            try:
+                self.mark_fired(event, local_day)
+            except Exception as e:
+                await self._report(on_error, event, e)
+            try:
+                await handler(event, local_day)
+                count += 1
+            except Exception as e:
+                await self._report(on_error, event, e)
+        return count
+
+    async def run_forever(self, on_error=None, max_sleep: int = 24 * 3600, retry: int = 60):
+        """
+        Fire due events, then sleep exactly until the next one (or a change).
+        Unexpected errors are printed and retried after `retry` seconds, so
+        the runner only ends when it is cancelled.
+        """
+        while True:
+            try:
+                await self.run_due(on_error=on_error)
+                now = datetime.now(timezone.utc)
+                wake = self.next_wake(now)
+                timeout = max_sleep if wake is None else min(max_sleep, max(1.0, (wake - now).total_seconds()))
+            except Exception as e:
+                print(f"⚠️ Calendar runner error: {e}")
+                timeout = retry
+            self.changed.clear()
+            try:
+                await asyncio.wait_for(self.changed.wait(), timeout=timeout)
+            except asyncio.TimeoutError:
+                pass
@@ -0,0 +1,188 @@
+# drops.py
+# ======================
+# Loot drops + secret missions engine
+# ======================
+# Active drops live in memory, indexed by channel (chests) and by member
+# (secret missions), so the message pipeline can tell in O(1) whether a
+# message could matter to any drop. Several drops can be live at once;
+# each carries an absolute expiry and the whole set is persisted, so a
+# restart picks up where it left off instead of forgetting the chest.
+#
+# Claims are decided synchronously (no await between the check and the
+# state change), so the first claimer wins even when several button
+# presses land in the same event-loop tick.
+
+import os
+import re
+import json
+import time
+import heapq
+import secrets
+
+from storage import save_json
+
+DROPS_FILE = "data/drops.json"
+
+CHEST = "chest"        # public: first member to press the button (or type !claim) wins
+MISSION = "mission"    # private: one member, completed by posting a clip
+
+CLIP_URL_RE = re.compile(
+    r"https?://(?:www\.)?(?:youtube\.com/(?:shorts|watch|clip)|youtu\.be/|(?:clips\.)?twitch\.tv/|"
+    r"medal\.tv/|streamable\.com/|outplayed\.tv/|gifyourgame\.com/|tiktok\.com/)",
+    re.IGNORECASE,
+)
+
+
+def is_clip(message) -> bool:
+    """A video attachment or a link to a known clip host."""
+    for a in getattr(message, "attachments", None) or ():
+        content_type = getattr(a, "content_type", None) or ""
+        if content_type.startswith("video/") or a.filename.lower().endswith((".mp4", ".mov", ".webm")):
+            return True
+    return bool(CLIP_URL_RE.search(message.content or ""))
+
+
+class Drop:
+    __slots__ = ("id", "kind", "channel_id", "user_id", "reward", "expires_at", "message_id", "claimed_by")
+
+    def __init__(self, id: str, kind: str, expires_at: float, reward: int, channel_id: int | None = None,
+                 user_id: int | None = None, message_id: int | None = None, claimed_by: int | None = None):
+        self.id = id
+        self.kind = kind
+        self.channel_id = channel_id
+        self.user_id = user_id
+        self.reward = reward
+        self.expires_at = expires_at
+        self.message_id = message_id
+        self.claimed_by = claimed_by
+
+    def to_dict(self) -> dict:
+        return {name: getattr(self, name) for name in self.__slots__ if getattr(self, name) is not None}
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "Drop":
+        return cls(**{k: v for k, v in data.items() if k in cls.__slots__})
+
+
+class DropEngine:
+    def __init__(self, path: str = DROPS_FILE):
+        self.path = path
+        self.drops = {}        # drop id -> Drop
+        self.by_channel = {}   # channel id -> [drop id, ...] (chests, oldest first)
+        self.by_user = {}      # member id -> drop id (one open mission each)
+        self._expiry = []      # min-heap of (expires_at, drop id); stale entries skipped
+        self.claimed = 0
+        self.expired = 0
+        self.load()
+
+    # ---------- persistence ----------
+    def load(self):
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, "r") as f:
+            for data in json.load(f):
+                self._index(Drop.from_dict(data))
+
+    def save(self):
+        save_json(self.path, [d.to_dict() for d in self.drops.values()],
+                  indent=None, separators=(",", ":"))
+
+    # ---------- indexes ----------
+    def _index(self, drop: Drop):
+        self.drops[drop.id] = drop
+        if drop.kind == CHEST and drop.channel_id is not None:
+            self.by_channel.setdefault(drop.channel_id, []).append(drop.id)
+        elif drop.kind == MISSION and drop.user_id is not None:
+            self.by_user[drop.user_id] = drop.id
+        heapq.heappush(self._expiry, (drop.expires_at, drop.id))
+
+    def _unindex(self, drop: Drop):
+        self.drops.pop(drop.id, None)
+        ids = self.by_channel.get(drop.channel_id)
+        if ids and drop.id in ids:
+            ids.remove(drop.id)
+            if not ids:
+                del self.by_channel[drop.channel_id]
+        if self.by_user.get(drop.user_id) == drop.id:
+            del self.by_user[drop.user_id]
+
+    def watching(self, channel_id: int, user_id: int) -> bool:
+        """O(1) pre-check for the message pipeline."""
+        return channel_id in self.by_channel or user_id in self.by_user
+
+    # ---------- lifecycle ----------
+    def spawn(self, kind: str, ttl: float, reward: int, channel_id: int | None = None,
+              user_id: int | None = None, now: float | None = None) -> Drop:
+        now = now if now is not None else time.time()
+        if kind == MISSION and user_id in self.by_user:
+            # A new mission replaces the member's unfinished one
+            self._unindex(self.drops[self.by_user[user_id]])
+        drop = Drop(secrets.token_hex(4), kind, now + ttl, reward, channel_id=channel_id, user_id=user_id)
+        self._index(drop)
+        self.save()
+        return drop
+
+    def attach_message(self, drop_id: str, message_id: int):
+        drop = self.drops.get(drop_id)
+        if drop:
+            drop.message_id = message_id
+            self.save()
+
+    def discard(self, drop_id: str):
+        """Remove a drop that never went live (e.g. its message failed to send)."""
+        drop = self.drops.get(drop_id)
+        if drop is not None:
+            self._unindex(drop)
+            self.save()
+
+    def claim(self, drop_id: str, user_id: int, now: float | None = None) -> Drop | None:
+        """First valid claim wins; later or late claims get None."""
+        now = now if now is not None else time.time()
+        drop = self.drops.get(drop_id)
+        if drop is None or drop.claimed_by is not None or now >= drop.expires_at:
+            return None
+        if drop.kind == MISSION and drop.user_id != user_id:
+            return None
+        drop.claimed_by = user_id
+        self._unindex(drop)
+        self.claimed += 1
+        self.save()
+        return drop
+
+    def claim_in_channel(self, channel_id: int, user_id: int, now: float | None = None) -> Drop | None:
+        """`!claim` fallback: the oldest live chest in the channel."""
+        for drop_id in list(self.by_channel.get(channel_id, ())):
+            drop = self.claim(drop_id, user_id, now)
+            if drop:
+                return drop
+        return None
+
+    def mission_for(self, user_id: int) -> Drop | None:
+        drop_id = self.by_user.get(user_id)
+        return self.drops.get(drop_id) if drop_id else None
+
+    def expire(self, now: float | None = None) -> list[Drop]:
+        """Remove and return every drop whose expiry has passed."""
+        now = now if now is not None else time.time()
+        gone = []
+        while self._expiry and self._expiry[0][0] <= now:
+            _, drop_id = heapq.heappop(self._expiry)
+            drop = self.drops.get(drop_id)
+            if drop is not None and drop.expires_at <= now:
+                self._unindex(drop)
+                gone.append(drop)
+        if gone:
+            self.expired += len(gone)
+            self.save()
+        return gone
+
+    def next_expiry(self) -> float | None:
+        while self._expiry and self._expiry[0][1] not in self.drops:
+            heapq.heappop(self._expiry)
+        return self._expiry[0][0] if self._expiry else None
+
+    def active(self, kind: str | None = None) -> list[Drop]:
+        return [d for d in self.drops.values() if kind is None or d.kind == kind]
+
+    def __len__(self):
+        return len(self.drops)
@@ -0,0 +1,66 @@
+# epic_ids.py
+# ======================
+# Persisted Epic display-name -> account-ID cache
+# ======================
+# Names are looked up case-insensitively. Entries expire after `ttl`
+# seconds, because a display name can be freed by a rename and claimed by
+# a different account; the account ID itself never changes, so members
+# keep theirs on their record and only the name mapping ages out.
+
+import os
+import json
+import time
+
+from storage import save_json
+
+EPIC_ID_FILE = "data/epic_ids.json"
+
+
+class EpicIdCache:
+    def __init__(self, path: str = EPIC_ID_FILE, ttl: int = 7 * 24 * 3600):
+        self.path = path
+        self.ttl = ttl
+        self.entries = {}   # lower(name) -> [account_id, resolved_at]
+        self.dirty = False
+        self.load()
+
+    def load(self):
+        if os.path.exists(self.path):
+            with open(self.path, "r") as f:
+                self.entries = json.load(f)
+
+    def save(self):
+        save_json(self.path, self.entries, indent=None, separators=(",", ":"))
+        self.dirty = False
+
+    def flush(self):
+        if self.dirty:
+            self.save()
+
+    def get(self, name: str, now: float | None = None) -> str | None:
+        """Account ID for `name`, or None if unknown or expired."""
+        entry = self.entries.get(name.lower())
+        if not entry:
+            return None
+        now = now if now is not None else time.time()
+        if now - entry[1] > self.ttl:
+            return None
+        return entry[0]
+
+    def put(self, name: str, account_id: str, now: float | None = None):
+        self.entries[name.lower()] = [account_id, now if now is not None else time.time()]
+        self.dirty = True
+
+    def forget(self, name: str):
+        if self.entries.pop(name.lower(), None) is not None:
+            self.dirty = True
+
+    def prune(self, now: float | None = None) -> int:
+        """Drop expired entries; returns how many were removed."""
+        now = now if now is not None else time.time()
+        expired = [k for k, (_, at) in self.entries.items() if now - at > self.ttl]
+        for k in expired:
+            del self.entries[k]
+        if expired:
+            self.dirty = True
+        return len(expired)
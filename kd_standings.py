@@ -0,0 +1,176 @@
+# kd_standings.py
+# ======================
+# Persisted KD standings + rolling incremental refresh
+# ======================
+# Keeps each linked player's last lifetime stats and fetch time on disk,
+# maintains a top-N min-heap keyed by (kd, wins) so the leaderboard can be
+# read instantly, and picks a small budget of the stalest accounts to
+# refresh each interval (players close to the top-N cutoff go first).
+
+import os
+import json
+import time
+import heapq
+
+from storage import save_json
+
+STANDINGS_FILE = "data/kd_standings.json"
+
+
+def _key(rec: dict) -> tuple:
+    return (float(rec.get("kd", 0) or 0), int(rec.get("wins", 0) or 0))
+
+
+class KDStandings:
+    def __init__(self, path: str = STANDINGS_FILE, top_n: int = 10,
+                 cutoff_margin: float = 0.5, stale_after: int = 7 * 24 * 3600):
+        self.path = path
+        self.top_n = top_n
+        self.cutoff_margin = cutoff_margin
+        self.stale_after = stale_after
+        self.records = {}   # uid -> {username, kd, wins, matches, kills, winRate, fetched_at}
+        self._heap = []     # min-heap of (kd, wins, uid), len <= top_n
+        self._in_heap = set()
+        self.dirty = False
+        self.load()
+
+    # ---------- persistence ----------
+    def load(self):
+        if os.path.exists(self.path):
+            with open(self.path, "r") as f:
+                self.records = json.load(f)
+        self._rebuild_heap()
+
+    def save(self):
+        save_json(self.path, self.records, indent=None)
+        self.dirty = False
+
+    def flush(self):
+        if self.dirty:
+            self.save()
+
+    # ---------- top-N heap ----------
+    def _rebuild_heap(self):
+        ranked = ((uid, rec) for uid, rec in self.records.items() if not rec.get("missing"))
+        best = heapq.nlargest(self.top_n, ranked, key=lambda kv: _key(kv[1]))
+        self._heap = [(*_key(rec), uid) for uid, rec in best]
+        heapq.heapify(self._heap)
+        self._in_heap = {uid for _, _, uid in self._heap}
+
+    def _push(self, uid: str):
+        entry = (*_key(self.records[uid]), uid)
+        if uid in self._in_heap:
+            old = next(e for e in self._heap if e[2] == uid)
+            if entry[:2] >= old[:2]:
+                # Still belongs in the top-N; fix up in place (N is tiny)
+                self._heap[self._heap.index(old)] = entry
+                heapq.heapify(self._heap)
+            else:
+                # Dropped: someone outside the heap may now outrank it
+                self._rebuild_heap()
+        elif len(self._heap) < self.top_n:
+            heapq.heappush(self._heap, entry)
+            self._in_heap.add(uid)
+        elif entry > self._heap[0]:
+            evicted = heapq.heapreplace(self._heap, entry)
+            self._in_heap.discard(evicted[2])
+            self._in_heap.add(uid)
+
+    def cutoff(self) -> tuple | None:
+        """(kd, wins) of the last place inside the top-N, or None if not full."""
+        if len(self._heap) < self.top_n:
+            return None
+        return self._heap[0][:2]
+
+    def top(self, n: int | None = None) -> list[dict]:
+        """Top players, best first, in the shape generate_leaderboard_image expects."""
+        ordered = sorted(self._heap, reverse=True)[: n or self.top_n]
+        return [
+            {
+                "uid": uid,
+                "username": self.records[uid].get("username", ""),
+                "kd": round(kd, 2),
+                "wins": wins,
+            }
+            for kd, wins, uid in ordered
+        ]
+
+    # ---------- updates ----------
+    def update(self, uid: str, username: str, stats: dict, now: float | None = None):
+        self.records[uid] = {
+            "username": username,
+            "kd": round(float(stats.get("kd", 0) or 0), 2),
+            "wins": int(stats.get("wins", 0) or 0),
+            "matches": int(stats.get("matches", 0) or 0),
+            "kills": int(stats.get("kills", 0) or 0),
+            "winRate": float(stats.get("winRate", 0.0) or 0.0),
+            "fetched_at": now if now is not None else time.time(),
+        }
+        self._push(uid)
+        self.dirty = True
+
+    def touch(self, uid: str, username: str, now: float | None = None):
+        """Mark a failed fetch so the account doesn't hog every refresh budget."""
+        now = now if now is not None else time.time()
+        rec = self.records.get(uid)
+        if rec is None:
+            self.records[uid] = {"username": username, "kd": 0.0, "wins": 0,
+                                 "fetched_at": now, "missing": True}
+        else:
+            rec["fetched_at"] = now
+        self.dirty = True
+
+    def prune(self, links: dict):
+        """Drop players who are no longer linked (or whose Epic name changed)."""
+        stale = [uid for uid, rec in self.records.items()
+                 if links.get(uid) != rec.get("username")]
+        for uid in stale:
+            del self.records[uid]
+        if stale:
+            self._rebuild_heap()
+            self.dirty = True
+        return len(stale)
+
+    # ---------- refresh scheduling ----------
+    def pick_stale(self, links: dict, budget: int, now: float | None = None) -> list[str]:
+        """
+        Choose up to `budget` linked uids to refresh. Never-fetched accounts
+        come first, then by age, with accounts near the cutoff aged faster.
+        """
+        now = now if now is not None else time.time()
+        cut = self.cutoff()
+
+        def priority(uid):
+            rec = self.records.get(uid)
+            if rec is None:
+                return float("-inf")
+            age = now - rec.get("fetched_at", 0)
+            if cut is None or uid in self._in_heap or abs(rec["kd"] - cut[0]) <= self.cutoff_margin:
+                age *= 4
+            return -age
+
+        return heapq.nsmallest(budget, links.keys(), key=priority)
+
+    async def refresh(self, links: dict, fetch, budget: int, on_hit=None, on_miss=None) -> int:
+        """
+        Fetch stats for the `budget` stalest linked accounts via
+        `await fetch(uid, username)`. Returns updated count.
+        """
+        self.prune(links)
+        updated = 0
+        for uid in self.pick_stale(links, budget):
+            username = links[uid]
+            stats = await fetch(uid, username)
+            if stats and isinstance(stats.get("kd", 0), (int, float)):
+                # Follow renames: the API reports the account's current name
+                username = stats.get("name") or username
+                self.update(uid, username, stats)
+                updated += 1
+                if on_hit:
+                    on_hit(uid, username, stats)
+            else:
+                self.touch(uid, username)
+                if on_miss:
+                    await on_miss(uid, username)
+        self.save()
+        return updated
@@ -1,8 +1,12 @@
-from flask import Flask
+from flask import Flask, Response, request, jsonify
+from werkzeug.middleware.proxy_fix import ProxyFix
 from threading import Thread
 import asyncio
+from api_snapshots import snapshots, rate_limiter, DEFAULT_PER_PAGE
 
 app = Flask(__name__)
+# Render's proxy appends the real client address to X-Forwarded-For; trust only that hop
+app.wsgi_app = ProxyFix(app.wsgi_app, x_for=1)
 
 @app.route('/')
 def home():
@@ -20,6 +24,60 @@ def healthz():
         return f"ERROR: {e}", 500
     return "✅ Self-maintenance complete", 200
 
+# ----------------------
+# Read-only JSON API (served from precomputed snapshots)
+# ----------------------
+def _client_ip():
+    return request.remote_addr or "unknown"
+
+def _int_arg(name, default):
+    try:
+        return int(request.args.get(name, default))
+    except (TypeError, ValueError):
+        return default
+
+def _serve(rendered):
+    if rendered is None:
+        return jsonify({"error": "not found"}), 404
+    headers = {
+        "ETag": f'"{rendered.etag}"',
+        "X-Generated-At": str(rendered.generated_at),
+        "Cache-Control": "public, max-age=30",
+        "Vary": "Accept-Encoding",
+        "Access-Control-Allow-Origin": "*",
+    }
+    if request.if_none_match.contains(rendered.etag):
+        return Response(status=304, headers=headers)
+    if "gzip" in request.headers.get("Accept-Encoding", ""):
+        headers["Content-Encoding"] = "gzip"
+        return Response(rendered.gzipped, headers=headers, mimetype="application/json")
+    return Response(rendered.body, headers=headers, mimetype="application/json")
+
+@app.before_request
+def _rate_limit():
+    if request.path.startswith("/api/") and not rate_limiter.allow(_client_ip()):
+        return jsonify({"error": "rate limited"}), 429, {"Retry-After": "1"}
+
+@app.route('/api/xp')
+def api_xp():
+    return _serve(snapshots.page("xp", _int_arg("page", 1), _int_arg("per_page", DEFAULT_PER_PAGE)))
+
+@app.route('/api/kd')
+def api_kd():
+    return _serve(snapshots.page("kd", _int_arg("page", 1), _int_arg("per_page", DEFAULT_PER_PAGE)))
+
+@app.route('/api/profile/<uid>')
+def api_profile(uid):
+    return _serve(snapshots.lookup("profiles", uid))
+
+@app.route('/api/tournaments')
+def api_tournaments():
+    return _serve(snapshots.page("tournaments", _int_arg("page", 1), _int_arg("per_page", DEFAULT_PER_PAGE)))
+
+@app.route('/api/tournaments/<name>')
+def api_tournament(name):
+    return _serve(snapshots.lookup("tournaments", name))
+
 def run():
     app.run(host="0.0.0.0", port=10000)
 
@@ -3,28 +3,42 @@
 # ================================
 # Features:
 # - XP / Rank System (Bronze → Unreal)
-# - Auto XP on messages + reactions
+# - Auto XP on messages + reactions (micro-batched off the command path)
+# - XP anti-abuse guard (per-member token buckets, duplicate detection, channel weights, /xplimits)
 # - Rank-up announcements
 # - KD Leaderboard (image, weekly autopost, wins as tiebreaker, live API)
+# - KD Standings store (rolling budgeted refresh, persisted top-10 heap)
+# - Stats history (weekly deltas, KD trend sparkline, biggest climbers)
+# - Unified member store (XP, Epic link, birthday, daily claim per member)
+# - Calendar engine (birthdays, Winterfest, QOTD, custom events via /addevent, /listevents, /removeevent; per-user timezones)
+# - Profiling (per-command/loop timings, slow-op log, loop lag monitor, /profile)
+# - Member-cache policy (full / active LRU / none) with on-demand member fetches
 # - "The Cleaner" role for top KD
 # - XP Leaderboard (rank-grouped embed)
-# - Epic Linking (/linkepic & !linkepic)
+# - Epic Linking (/linkepic & !linkepic, account IDs resolved + cached)
 # - Promote XP command (with 2x XP boost react)
 # - Birthday system (role, 2x XP, themed post)
-# - Fortnite Tournaments (BritBowl, Crew Up, Winterfest)
+# - Fortnite Tournaments (BritBowl, Crew Up, Winterfest; capacity + waitlists, KD-seeded brackets/squads)
 # - Creator Map Tracker (BritBoy96 default + up to 25)
 # - Podcast RSS autoposter
 # - Daily backup
+# - Streaming state export / import (/exportstate, /importstate, state_transfer.py CLI)
 # - Flask Keepalive for Render
+# - Read-only JSON API (/api/xp, /api/kd, /api/profile, /api/tournaments) from cached snapshots
 # - UptimeRobot health check triggers catch-up sweep
 # - Daily QOTD (kid-friendly pool from qotd.json)
-# - Loot Drops (10,000 XP claimable)
+# - Loot Drops (10,000 XP, claim button, several at once, survive restarts)
 # - Hidden XP Multipliers (random days)
-# - Secret Challenges (monthly DM missions)
+# - Secret Challenges (monthly DM missions, clip posts verified automatically)
 # ================================
 
+import io
 import os
-import json
+import re
+import time
+import signal
+import tempfile
+import heapq
 import random
 import discord
 import aiohttp
@@ -36,6 +50,24 @@ from discord import app_commands
 from keep_alive import keep_alive
 from generate_leaderboard_image import generate_leaderboard_image
 from leaderboard_utils import assign_rank, get_rank_role
+from storage import load_json, save_json
+from kd_standings import KDStandings
+from stats_history import StatsHistory
+from member_store import MemberStore
+from epic_ids import EpicIdCache
+import state_transfer
+from xp_ingest import XPBatcher
+from xp_guard import XPGuard, GuardLimits
+from member_cache import (
+    POLICIES, ActiveMembers, cache_settings, resolve_member, random_member,
+    cached_member_count, rss_mb,
+)
+from tournament_engine import TournamentStore
+from drops import DropEngine, CHEST, MISSION, is_clip
+from calendar_engine import Calendar, CalendarEvent, DAILY, is_valid_zone
+import profiling
+from profiling import profiled, LagMonitor
+import api_snapshots
 
 # ----------------------
 # Helper: Week Label
@@ -58,6 +90,7 @@ def compute_week_label():
 DISCORD_TOKEN = os.getenv("DISCORD_BOT_TOKEN")
 FORTNITE_API_KEY = os.getenv("FORTNITE_API_KEY")
 PODCAST_RSS_FEED = os.getenv("PODCAST_RSS_FEED")
+FORTNITE_API_BASE = os.getenv("FORTNITE_API_BASE", "https://fortnite-api.com").rstrip("/")
 
 LEADERBOARD_CHANNEL_ID = int(os.getenv("LEADERBOARD_CHANNEL", 0))
 SYSTEM_CHANNEL_ID = 1140430213440876716
@@ -66,13 +99,55 @@ BIRTHDAY_CHANNEL_ID = int(os.getenv("BIRTHDAY_CHANNEL", 0))
 PODCAST_CHANNEL_ID = int(os.getenv("PODCAST_CHANNEL", 0))
 QOTD_CHANNEL_ID = int(os.getenv("QOTD_CHANNEL_ID", 1140430213440876716))
 
-XP_FILE = "xp_data.json"
-EPIC_FILE = "epic_links.json"
-BIRTHDAY_FILE = "birthdays.json"
+XP_FILE = "xp_data.json"              # legacy, migrated into MEMBERS_FILE
+EPIC_FILE = "epic_links.json"         # legacy, migrated into MEMBERS_FILE
+BIRTHDAY_FILE = "birthdays.json"      # legacy, migrated into MEMBERS_FILE
+DAILY_FILE = "daily_claims.json"      # legacy, migrated into MEMBERS_FILE
+MEMBERS_FILE = "data/members.json"
+CALENDAR_FILE = "data/calendar.json"
+EPIC_ID_FILE = "data/epic_ids.json"
+CLEANER_FILE = "data/cleaner.json"
+DROPS_FILE = "data/drops.json"
+XP_LIMITS_FILE = "data/xp_limits.json"
+
+profiling.SLOW_WALL_S = int(os.getenv("SLOW_OP_MS", 2000)) / 1000      # slow command/loop threshold
+profiling.SLOW_BLOCK_S = int(os.getenv("SLOW_BLOCK_MS", 100)) / 1000    # loop-blocking threshold
+LOOP_LAG_MS = int(os.getenv("LOOP_LAG_MS", 250))                         # lag monitor threshold
+
+QOTD_HOUR = int(os.getenv("QOTD_HOUR", 12))              # UTC hour for the daily QOTD
+WINTERFEST_HOUR = int(os.getenv("WINTERFEST_HOUR", 10))  # UTC hour for Winterfest challenges
 TOURNAMENT_FILE = "data/tournaments.json"
 BACKUP_FILE = "backup.json"
 CREATOR_FILE = "creator_maps.json"
 QOTD_FILE = "qotd.json"
+KD_STANDINGS_FILE = "data/kd_standings.json"
+STATS_HISTORY_FILE = "data/stats_history.bin"
+
+MEMBER_CACHE_POLICY = os.getenv("MEMBER_CACHE_POLICY", "full").lower()  # full | active | none
+if MEMBER_CACHE_POLICY not in POLICIES:
+    MEMBER_CACHE_POLICY = "full"
+ACTIVE_MEMBER_LRU = int(os.getenv("ACTIVE_MEMBER_LRU", 500))  # members kept by the "active" policy
+
+XP_BATCH_MS = int(os.getenv("XP_BATCH_MS", 250))   # XP queue drain interval
+XP_LOG_SECONDS = int(os.getenv("XP_LOG_SECONDS", 60))   # XP summary post interval
+XP_EVENTS_PER_MIN = float(os.getenv("XP_EVENTS_PER_MIN", 12))   # default guard refill rate
+XP_BURST = float(os.getenv("XP_BURST", 6))                       # default guard bucket size
+XP_DUP_WINDOW = float(os.getenv("XP_DUP_WINDOW", 60))            # seconds a repeated message earns nothing
+
+KD_REFRESH_BUDGET = int(os.getenv("KD_REFRESH_BUDGET", 25))      # accounts per refresh
+KD_REFRESH_MINUTES = int(os.getenv("KD_REFRESH_MINUTES", 30))    # refresh interval
+EPIC_ID_TTL_HOURS = int(os.getenv("EPIC_ID_TTL_HOURS", 168))     # name -> account ID cache TTL
+EPIC_ID_REFRESH_BUDGET = int(os.getenv("EPIC_ID_REFRESH_BUDGET", 25))  # lookups per name-refresh run
+
+API_SNAPSHOT_SECONDS = int(os.getenv("API_SNAPSHOT_SECONDS", 60))   # JSON API snapshot refresh
+api_snapshots.rate_limiter.rate = float(os.getenv("API_RATE_PER_SEC", 2))   # per-IP API rate
+api_snapshots.rate_limiter.burst = int(os.getenv("API_RATE_BURST", 30))
+
+LOOT_DROP_HOURS = float(os.getenv("LOOT_DROP_HOURS", 5))     # chest lifetime
+LOOT_DROP_XP = int(os.getenv("LOOT_DROP_XP", 10000))
+MAX_LOOT_DROPS = int(os.getenv("MAX_LOOT_DROPS", 3))          # concurrent chests
+MISSION_HOURS = float(os.getenv("MISSION_HOURS", 24))         # secret mission window
+MISSION_XP = int(os.getenv("MISSION_XP", 100))
 
 CREW_ROLE_ID = 1372346291023249511  # Crew Member role for tagging
 
@@ -82,29 +157,25 @@ CREW_ROLE_ID = 1372346291023249511  # Crew Member role for tagging
 intents = discord.Intents.default()
 intents.message_content = True
 intents.members = True
-bot = commands.Bot(command_prefix="!", intents=intents)
+bot = commands.Bot(command_prefix="!", intents=intents, **cache_settings(MEMBER_CACHE_POLICY))
+active_members = ActiveMembers(ACTIVE_MEMBER_LRU, enabled=MEMBER_CACHE_POLICY == "active")
 
 # ----------------------
 # Utility
 # ----------------------
-def load_json(path, fallback):
-    if not os.path.exists(path):
-        return fallback
-    with open(path, "r") as f:
-        return json.load(f)
-
-def save_json(path, data):
-    with open(path, "w") as f:
-        json.dump(data, f, indent=2)
-
-xp_data = load_json(XP_FILE, {})
-epic_links = load_json(EPIC_FILE, {})
-birthdays = load_json(BIRTHDAY_FILE, {})
-tournaments = load_json(TOURNAMENT_FILE, {})
+members = MemberStore(MEMBERS_FILE).load(legacy={
+    "xp": XP_FILE,
+    "epic": EPIC_FILE,
+    "birthday": BIRTHDAY_FILE,
+    "daily_claim": DAILY_FILE,
+})
+tournaments = TournamentStore(TOURNAMENT_FILE).load()
 creator_maps = load_json(CREATOR_FILE, {"tracked": ["BritBoy96"], "posted": {}})
 qotd_data = load_json(QOTD_FILE, {"questions": []})
 used_qotd = []
-last_qotd_date = None
+event_calendar = Calendar(CALENDAR_FILE)
+drop_engine = DropEngine(DROPS_FILE)
+calendar_task = None
 
 def system_channel():
     return bot.get_channel(SYSTEM_CHANNEL_ID)
@@ -138,17 +209,16 @@ async def send_reply(ctx, content=None, embed=None, file=None, ephemeral=False):
 # XP / Rank System
 # ----------------------
 xp_multiplier = 1
+xp_batcher = XPBatcher()
+xp_guard = XPGuard(XP_LIMITS_FILE, GuardLimits(XP_EVENTS_PER_MIN / 60, XP_BURST, XP_DUP_WINDOW))
 
-async def add_xp(user_id, amount, channel=None):
-    uid = str(user_id)
-    xp_data[uid] = xp_data.get(uid, 0) + (amount * xp_multiplier)
-    save_json(XP_FILE, xp_data)
-
-    new_rank = assign_rank(xp_data[uid])
-    role_name = get_rank_role(new_rank)
+async def sync_rank_role(user_id, total, channel=None, member=None):
+    """Give the member the role for their XP total; announce if it's new."""
+    role_name = get_rank_role(assign_rank(total))
     guild = channel.guild if channel else None
     if guild:
-        member = guild.get_member(user_id)
+        if getattr(getattr(member, "guild", None), "id", None) != guild.id:   # Users from DMs have no guild
+            member = await resolve_member(guild, user_id, active_members)
         if member:
             role = discord.utils.get(guild.roles, name=role_name)
             if role and role not in member.roles:
@@ -156,38 +226,113 @@ async def add_xp(user_id, amount, channel=None):
                 await log_event(f"⭐ {member} ranked up to {role_name}")
                 if channel:
                     await channel.send(f"🎉 {member.mention} ranked up to **{role_name}**!")
-    await log_event(f"➕ {amount} XP added to <@{user_id}> (total {xp_data[uid]})")
+
+async def add_xp(user_id, amount, channel=None):
+    """Apply XP immediately (commands, birthdays, loot). Gateway events use queue_xp."""
+    total = members.add_xp(user_id, amount * xp_multiplier)  # flushed by flush_members
+    await sync_rank_role(user_id, total, channel)
+    await log_event(f"➕ {amount} XP added to <@{user_id}> (total {total})")
+
+def queue_xp(user_id, amount, channel=None, member=None):
+    """Queue XP for the next batch; the multiplier is the one active right now."""
+    xp_batcher.push(user_id, amount, xp_multiplier, channel, member)
+
+_last_xp_summary = time.monotonic()
+
+@tasks.loop(seconds=XP_BATCH_MS / 1000)
+@profiled
+async def drain_xp_queue():
+    """Apply queued XP: one update, one rank check and at most one rank-up post per user."""
+    global _last_xp_summary
+    for user_id, pending in xp_batcher.drain().items():
+        total = members.add_xp(user_id, pending.delta)
+        xp_batcher.applied(user_id, pending)
+        try:
+            await sync_rank_role(user_id, total, pending.channel, pending.member)
+        except Exception as e:
+            xp_batcher.failed(e)   # reported in the summary, never stops the loop
+
+    # One summary post per XP_LOG_SECONDS instead of one per tick
+    now = time.monotonic()
+    if now - _last_xp_summary < XP_LOG_SECONDS:
+        return
+    _last_xp_summary = now
+    window = xp_batcher.take_window()
+    if not window:
+        return
+    text = f"➕ {window['xp']} XP added from {window['events']} events across {window['members']} members"
+    if window["errors"]:
+        text += f" (⚠️ {window['errors']} rank update(s) failed, last: {window['last_error']})"
+    try:
+        await log_event(text)
+    except Exception as e:
+        print(f"⚠️ XP summary not posted: {e}")
+
+@drain_xp_queue.error
+async def drain_xp_queue_error(error):
+    """tasks.loop only restarts itself on connection errors; keep XP flowing regardless."""
+    print(f"⚠️ XP drain loop crashed: {error!r}; restarting")
+    drain_xp_queue.restart()
 
 @bot.event
 async def on_message(message):
     if message.author.bot:
         return
-    await add_xp(message.author.id, 5, message.channel)
+    active_members.touch(message.author)
+    guild_id = message.guild.id if message.guild else 0
+    weight = xp_guard.check(guild_id, message.author.id, message.channel.id, message.content)
+    if weight:
+        queue_xp(message.author.id, round(5 * weight), message.channel, message.author)
+    if drop_engine.watching(message.channel.id, message.author.id):
+        await handle_drop_message(message)
     await bot.process_commands(message)
 
 @bot.event
 async def on_reaction_add(reaction, user):
     if user.bot:
         return
-    await add_xp(user.id, 10, reaction.message.channel)
+    active_members.touch(user)
+    msg = reaction.message
+    guild_id = msg.guild.id if msg.guild else 0
+    # Same hash per message, so un-react/re-react farming counts as a duplicate
+    weight = xp_guard.check(guild_id, user.id, msg.channel.id, f"reaction:{msg.id}", kind="reaction")
+    if weight:
+        queue_xp(user.id, round(10 * weight), msg.channel, user)
+
+@tasks.loop(seconds=15)
+@profiled
+async def flush_members():
+    """Batch member-store, roster and standings writes instead of rewriting a file per event."""
+    members.flush()
+    tournaments.flush()
+    kd_standings.flush()
+
+def save_state_on_exit():
+    """Apply still-queued XP and write every batched store once the bot has stopped."""
+    for user_id, pending in xp_batcher.drain().items():
+        members.add_xp(user_id, pending.delta)   # rank roles catch up on the next XP event
+    members.flush()
+    tournaments.flush()
+    kd_standings.flush()
+    epic_ids.flush()
+    print("💾 State saved on shutdown")
+
+def _stop_on_sigterm(signum, frame):
+    # Render stops the service with SIGTERM; unwind bot.run like Ctrl+C does
+    raise KeyboardInterrupt
 
 # ----------------------
 # Daily Claim
 # ----------------------
-DAILY_FILE = "daily_claims.json"
-daily_claims = load_json(DAILY_FILE, {})
 
 @bot.hybrid_command(name="daily", description="Claim your daily XP bonus")
+@profiled
 async def daily(ctx):
     if ctx.interaction and not ctx.interaction.response.is_done():
         await ctx.interaction.response.defer(thinking=True)
-    uid = str(ctx.author.id)
-    today = date.today().isoformat()
-    last_claim = daily_claims.get(uid)
-    if last_claim == today:
+    if not members.claim_daily(ctx.author.id, date.today()):
         return await ctx.followup.send("⏳ You've already claimed your daily XP today.")
-    daily_claims[uid] = today
-    save_json(DAILY_FILE, daily_claims)
+    members.save()
     await add_xp(ctx.author.id, 50, ctx.channel)
     await ctx.followup.send(f"✅ {ctx.author.mention}, you claimed **50 XP**!")
     await log_event(f"🎁 Daily XP claimed by {ctx.author}")
@@ -196,25 +341,40 @@ async def daily(ctx):
 # Core Commands
 # ----------------------
 @bot.hybrid_command(name="linkepic", description="Link your Epic Games username")
+@profiled
 async def linkepic(ctx, epic_username: str):
     if ctx.interaction and not ctx.interaction.response.is_done():
         await ctx.interaction.response.defer(thinking=True)
-    epic_links[str(ctx.author.id)] = epic_username
-    save_json(EPIC_FILE, epic_links)
-    await ctx.followup.send(f"🔗 Linked your Epic username to **{epic_username}**")
+    # Resolve the account ID once; later stats lookups go by ID
+    stats = await fetch_fortnite_stats(epic_username)
+    epic_id = stats.get("account_id") if stats else None
+    members.set_epic(ctx.author.id, epic_username, epic_id)
+    members.save()
+    epic_ids.flush()
+    if stats:
+        record_stats(ctx.author.id, epic_username, stats)
+        await ctx.followup.send(f"🔗 Linked your Epic username to **{epic_username}**")
+    else:
+        await ctx.followup.send(
+            f"🔗 Linked your Epic username to **{epic_username}** "
+            f"(couldn't find that account yet — I'll keep retrying in the background)"
+        )
     await log_event(f"🔗 {ctx.author} linked Epic → {epic_username}")
 
 @bot.hybrid_command(name="epicslinked", description="Show all linked Epic accounts")
+@profiled
 async def epicslinked(ctx):
     if ctx.interaction and not ctx.interaction.response.is_done():
         await ctx.interaction.response.defer(thinking=True)
-    if not epic_links:
+    links = members.epic_links()
+    if not links:
         return await ctx.followup.send("❌ No Epic accounts linked yet.")
-    lines = [f"<@{uid}> → {uname}" for uid, uname in epic_links.items()]
+    lines = [f"<@{uid}> → {uname}" for uid, uname in links.items()]
     await ctx.followup.send("📜 **Linked Epic Accounts:**\n" + "\n".join(lines))
     await log_event("📜 Epic links list requested")
 
 @bot.hybrid_command(name="ping", description="Ping test")
+@profiled
 async def ping(ctx):
     if ctx.interaction and not ctx.interaction.response.is_done():
         await ctx.interaction.response.defer(thinking=True)
@@ -222,10 +382,11 @@ async def ping(ctx):
     await log_event("🏓 Ping command used")
 
 @bot.hybrid_command(name="rank", description="Check your XP rank")
+@profiled
 async def rank(ctx):
     if ctx.interaction and not ctx.interaction.response.is_done():
         await ctx.interaction.response.defer(thinking=True)
-    xp = xp_data.get(str(ctx.author.id), 0)
+    xp = members.xp(ctx.author.id)
     role = get_rank_role(assign_rank(xp))
     await ctx.followup.send(f"⭐ {ctx.author.mention} has {xp} XP ({role})")
     await log_event(f"📊 Rank checked by {ctx.author} — {xp} XP, {role}")
@@ -234,10 +395,11 @@ async def rank(ctx):
 # XP Leaderboard (Embed)
 # ----------------------
 @bot.hybrid_command(name="xpleaderboard", description="Show XP leaderboard by rank")
+@profiled
 async def xpleaderboard(ctx):
     if ctx.interaction and not ctx.interaction.response.is_done():
         await ctx.interaction.response.defer(thinking=True)
-    if not xp_data:
+    if not members.has_xp():
         return await ctx.followup.send("❌ No XP data yet.")
     order = [
         "UNREAL","CHAMPION","ELITE",
@@ -249,16 +411,16 @@ async def xpleaderboard(ctx):
     ]
     embed = discord.Embed(title="🏆 XP Leaderboard", color=discord.Color.blue())
     grouped = {rank: [] for rank in order}
-    for uid, xp in xp_data.items():
+    for uid, xp in members.xp_items():
         rank = get_rank_role(assign_rank(xp))
         if rank in grouped:
             grouped[rank].append((uid, xp))
     for rank in order:
         if grouped[rank]:
-            members = sorted(grouped[rank], key=lambda x: x[1], reverse=True)
+            ranked = sorted(grouped[rank], key=lambda x: x[1], reverse=True)
             embed.add_field(
                 name=rank,
-                value="\n".join([f"<@{u}> — {x} XP" for u, x in members]),
+                value="\n".join([f"<@{u}> — {x} XP" for u, x in ranked]),
                 inline=False
             )
     await ctx.followup.send(embed=embed)
@@ -266,16 +428,24 @@ async def xpleaderboard(ctx):
 # ----------------------
 # KD Leaderboard + Cleaner Role
 # ----------------------
-async def fetch_fortnite_stats(epic_username: str):
+epic_ids = EpicIdCache(EPIC_ID_FILE, ttl=EPIC_ID_TTL_HOURS * 3600)
+
+async def fetch_fortnite_stats(epic_username: str, account_id: str | None = None):
     """
-    Returns dict with keys: kd, wins, matches, kills, winRate
-    or None if not found / API error.
+    Returns dict with keys: kd, wins, matches, kills, winRate, account_id, name
+    or None if not found / API error. Uses the ID endpoint when the account
+    ID is known (passed in or cached), otherwise looks up by display name
+    and caches the resolved ID.
     """
     if not FORTNITE_API_KEY:
         await log_event("⚠️ Missing FORTNITE_API_KEY; cannot fetch stats.")
         return None
 
-    url = f"https://fortnite-api.com/v2/stats/br/v2?name={epic_username}"
+    account_id = account_id or epic_ids.get(epic_username)
+    if account_id:
+        url = f"{FORTNITE_API_BASE}/v2/stats/br/v2/{account_id}"
+    else:
+        url = f"{FORTNITE_API_BASE}/v2/stats/br/v2?name={epic_username}"
     headers = {"Authorization": FORTNITE_API_KEY}
 
     try:
@@ -284,6 +454,9 @@ async def fetch_fortnite_stats(epic_username: str):
                 if resp.status != 200:
                     txt = await resp.text()
                     await log_event(f"⚠️ Stats API {resp.status} for {epic_username}: {txt[:120]}")
+                    if resp.status == 404 and account_id:
+                        epic_ids.forget(epic_username)
+                        members.clear_epic_id(account_id)
                     return None
                 data = await resp.json()
     except Exception as e:
@@ -292,63 +465,140 @@ async def fetch_fortnite_stats(epic_username: str):
 
     try:
         stats = data["data"]["stats"]["all"]["overall"]
+        account = data["data"].get("account") or {}
+        if account.get("id"):
+            epic_ids.put(account.get("name") or epic_username, account["id"])
         return {
             "kd": stats.get("kd", 0) or 0,
             "wins": stats.get("wins", 0) or 0,
             "matches": stats.get("matches", 0) or 0,
             "kills": stats.get("kills", 0) or 0,
-            "winRate": stats.get("winRate", 0.0) or 0.0
+            "winRate": stats.get("winRate", 0.0) or 0.0,
+            "account_id": account.get("id") or account_id,
+            "name": account.get("name") or epic_username,
         }
     except Exception:
         await log_event(f"⚠️ Unexpected stats shape for {epic_username}: {str(data)[:140]}")
         return None
 
-last_cleaner = None
+last_cleaner = load_json(CLEANER_FILE, {}).get("holder")
+kd_standings = KDStandings(KD_STANDINGS_FILE, top_n=10)
+stats_history = StatsHistory(STATS_HISTORY_FILE)
+
+def record_stats(uid, epic_username, stats):
+    """Keep every fetched snapshot: standings heap + local time-series."""
+    kd_standings.update(str(uid), epic_username, stats)
+    stats_history.record(uid, stats)
+
+async def _log_missing_stats(uid, epic_username):
+    await log_event(f"ℹ️ No stats for {epic_username}; skipping.")
+
+async def fetch_linked_stats(uid, epic_username=None):
+    """Stats for a linked member, by account ID when we have one."""
+    m = members.get(uid)
+    if not m or not m.epic:
+        return None
+    return await fetch_fortnite_stats(epic_username or m.epic, m.epic_id)
+
+def sync_epic_account(uid, stats):
+    """Store a newly resolved account ID and follow Epic renames."""
+    m = members.get(uid)
+    if not m or not stats:
+        return
+    name = stats.get("name") or m.epic
+    epic_id = stats.get("account_id") or m.epic_id
+    if name != m.epic or epic_id != m.epic_id:
+        members.set_epic(uid, name, epic_id)
+
+def _on_standings_hit(uid, _, stats):
+    sync_epic_account(uid, stats)
+    stats_history.record(uid, stats)
+
+@tasks.loop(hours=6)
+@profiled
+async def refresh_epic_ids():
+    """
+    Backfill account IDs for name-only links (legacy / backscan) and
+    re-check names whose cache entry expired so renames are picked up.
+    Least recently attempted first, so names that never resolve (private
+    or typo'd) rotate through the budget instead of starving the rest.
+    """
+    due = [m for m in members.members.values()
+           if m.epic and (not m.epic_id or epic_ids.get(m.epic) is None)]
+    now = int(time.time())
+    resolved = renamed = 0
+    for m in heapq.nsmallest(EPIC_ID_REFRESH_BUDGET, due, key=lambda m: (m.epic_checked, m.epic_id is not None)):
+        m.epic_checked = now
+        members.dirty = True
+        old = m.epic
+        stats = await fetch_fortnite_stats(m.epic, m.epic_id)
+        if not stats:
+            continue
+        sync_epic_account(m.id, stats)
+        record_stats(m.id, m.epic, stats)
+        resolved += 1
+        if m.epic != old:
+            renamed += 1
+            await log_event(f"🔁 Epic rename followed for <@{m.id}>: {old} → {m.epic}")
+    epic_ids.prune()
+    epic_ids.flush()
+    if resolved:
+        await log_event(f"🪪 Epic IDs refreshed: {resolved} lookup(s), {renamed} rename(s)")
+
+@tasks.loop(minutes=KD_REFRESH_MINUTES)
+@profiled
+async def refresh_kd_standings():
+    """Refresh a budgeted slice of the stalest linked accounts."""
+    links = members.epic_links()
+    if not links:
+        return
+    updated = await kd_standings.refresh(
+        links, fetch_linked_stats, KD_REFRESH_BUDGET,
+        on_hit=_on_standings_hit,
+        on_miss=_log_missing_stats
+    )
+    epic_ids.flush()
+    if updated:
+        await log_event(f"🔄 KD standings refreshed for {updated} account(s).")
 
 async def generate_kd_leaderboard(epic_links_map: dict) -> str | None:
     """
-    Builds top-10 list from epic_links, calls generate_leaderboard_image(top10),
+    Reads the current top-10 from the KD standings heap (kept fresh by
+    refresh_kd_standings), calls generate_leaderboard_image(top10),
     assigns 'The Cleaner', and returns file path or None.
     """
     global last_cleaner
-    players = []
 
     if not epic_links_map:
         await log_event("ℹ️ No epic links found; KD leaderboard will be empty.")
         return None
 
-    # Fetch each linked user's stats (sequential for API friendliness)
-    for uid, epic_username in epic_links_map.items():
-        stats = await fetch_fortnite_stats(epic_username)
-        if stats and isinstance(stats.get("kd", 0), (int, float)):
-            players.append({
-                "uid": uid,
-                "username": epic_username,
-                "kd": round(float(stats["kd"]), 2),
-                "wins": int(stats["wins"]),
-            })
-        else:
-            await log_event(f"ℹ️ No stats for {epic_username}; skipping.")
-
-    # Sort by KD desc, then wins desc
-    players.sort(key=lambda p: (-p["kd"], -p["wins"]))
-    top10 = players[:10]
+    # Only show players who are still linked under the same Epic name
+    top10 = [p for p in kd_standings.top() if epic_links_map.get(p["uid"]) == p["username"]]
 
     # Give / rotate "The Cleaner"
     if top10 and bot.guilds:
         guild = bot.guilds[0]
         cleaner_role = discord.utils.get(guild.roles, name="The Cleaner")
         if cleaner_role:
-            # Remove from current holder(s)
-            for m in guild.members:
-                if cleaner_role in m.roles:
+            winner_id = int(top10[0]["uid"])
+            # Remove from current holder(s): cached role members + the recorded holder
+            holders = {m.id for m in cleaner_role.members}
+            if last_cleaner:
+                holders.add(last_cleaner)
+            holders.discard(winner_id)
+            for holder_id in holders:
+                m = await resolve_member(guild, holder_id, active_members)
+                if m and cleaner_role in m.roles:
                     await m.remove_roles(cleaner_role)
             # Give to winner
-            winner_member = guild.get_member(int(top10[0]["uid"]))
+            winner_member = await resolve_member(guild, winner_id, active_members)
             if winner_member:
-                await winner_member.add_roles(cleaner_role)
+                if cleaner_role not in winner_member.roles:
+                    await winner_member.add_roles(cleaner_role)
                 if last_cleaner != winner_member.id:
                     last_cleaner = winner_member.id
+                    save_json(CLEANER_FILE, {"holder": last_cleaner})
                     embed = discord.Embed(
                         title="🧹 New Cleaner Crowned!",
                         description=f"{winner_member.mention} cleaned up the lobbies!",
@@ -361,7 +611,7 @@ async def generate_kd_leaderboard(epic_links_map: dict) -> str | None:
 
     # Generate image if we have something to show
     if not top10:
-        await log_event("ℹ️ KD leaderboard empty after fetch; no image created.")
+        await log_event("ℹ️ KD standings still empty (refresh warming up); no image created.")
         return None
 
     try:
@@ -378,10 +628,11 @@ async def generate_kd_leaderboard(epic_links_map: dict) -> str | None:
         return None
 
 @bot.hybrid_command(name="kdleaderboard", description="Show KD leaderboard")
+@profiled
 async def kdleaderboard(ctx):
     if ctx.interaction and not ctx.interaction.response.is_done():
         await ctx.interaction.response.defer(thinking=True)
-    img = await generate_kd_leaderboard(epic_links)
+    img = await generate_kd_leaderboard(members.epic_links())
     if img:
         await ctx.followup.send(file=discord.File(img))
         await log_event("📊 KD leaderboard requested.")
@@ -390,35 +641,57 @@ async def kdleaderboard(ctx):
         await log_event("⚠️ KD leaderboard build failed (empty or error).")
 
 @tasks.loop(hours=168)
+@profiled
 async def autopost_leaderboard():
     ch = leaderboard_channel()
     if not ch:
         await log_event("ℹ️ No leaderboard channel set; skipping weekly KD autopost.")
         return
-    img = await generate_kd_leaderboard(epic_links)
+    img = await generate_kd_leaderboard(members.epic_links())
     if img:
         await ch.send("📊 Weekly KD Leaderboard", file=discord.File(img))
         await log_event("📊 Weekly KD leaderboard autoposted.")
+        climbers = climbers_embed()
+        if climbers:
+            await ch.send(embed=climbers)
     else:
         await ch.send("⚠️ Weekly KD Leaderboard could not be generated this week.")
         await log_event("⚠️ Weekly KD leaderboard autopost failed (empty or error).")
 
+def climbers_embed():
+    """'Biggest Climbers' panel from the local stats history (no API calls)."""
+    top = stats_history.climbers(n=5)
+    if not top:
+        return None
+    embed = discord.Embed(title="📈 Biggest Climbers This Week", color=discord.Color.green())
+    lines = []
+    for i, (uid, d) in enumerate(top, start=1):
+        lines.append(
+            f"**{i}.** <@{uid}> — K/D **{d['kd']:+}** · 🏆 {d['wins']:+} wins · 🎮 {d['matches']} matches"
+        )
+    embed.description = "\n".join(lines)
+    return embed
+
 # ----------------------
 # Fortnite Player Stats
 # ----------------------
 @bot.hybrid_command(name="mystats", description="Show your linked Fortnite stats")
+@profiled
 async def mystats(ctx):
     if ctx.interaction and not ctx.interaction.response.is_done():
         await ctx.interaction.response.defer(thinking=True)
 
     uid = str(ctx.author.id)
-    epic = epic_links.get(uid)
+    epic = members.epic(uid)
     if not epic:
         return await ctx.followup.send("❌ You haven't linked your Epic account. Use `/linkepic <username>` first.")
 
-    stats = await fetch_fortnite_stats(epic)
+    stats = await fetch_linked_stats(uid)
     if not stats:
         return await ctx.followup.send(f"⚠️ Could not fetch stats for **{epic}**.")
+    sync_epic_account(uid, stats)
+    epic = stats["name"]
+    record_stats(uid, epic, stats)
 
     embed = discord.Embed(title=f"🎮 {epic} — Lifetime Stats", color=discord.Color.blue())
     embed.add_field(name="🏆 Wins", value=stats.get("wins", 0))
@@ -429,19 +702,24 @@ async def mystats(ctx):
     await log_event(f"📊 /mystats used by {ctx.author} → {epic}")
 
 @bot.hybrid_command(name="compare", description="Compare Fortnite stats between 2 linked users")
+@profiled
 async def compare(ctx, user1: discord.Member, user2: discord.Member):
     if ctx.interaction and not ctx.interaction.response.is_done():
         await ctx.interaction.response.defer(thinking=True)
 
-    epic1 = epic_links.get(str(user1.id))
-    epic2 = epic_links.get(str(user2.id))
+    epic1 = members.epic(user1.id)
+    epic2 = members.epic(user2.id)
     if not epic1 or not epic2:
         return await ctx.followup.send("❌ Both users must have linked their Epic accounts.")
 
-    stats1 = await fetch_fortnite_stats(epic1)
-    stats2 = await fetch_fortnite_stats(epic2)
+    stats1 = await fetch_linked_stats(user1.id)
+    stats2 = await fetch_linked_stats(user2.id)
     if not stats1 or not stats2:
         return await ctx.followup.send("⚠️ Could not fetch stats for one or both players.")
+    for member, stats in ((user1, stats1), (user2, stats2)):
+        sync_epic_account(member.id, stats)
+        record_stats(member.id, stats["name"], stats)
+    epic1, epic2 = stats1["name"], stats2["name"]
 
     embed = discord.Embed(title="⚔️ Fortnite Stat Showdown", color=discord.Color.gold())
     embed.add_field(name=f"{epic1}", value=f"🏆 Wins: {stats1['wins']}\n🔪 K/D: {stats1['kd']}", inline=True)
@@ -449,70 +727,234 @@ async def compare(ctx, user1: discord.Member, user2: discord.Member):
     await ctx.followup.send(embed=embed)
     await log_event(f"⚔️ /compare: {user1} vs {user2}")
 
+@bot.hybrid_command(name="kdtrend", description="Show weekly stat changes and KD trend (no live API call)")
+@profiled
+async def kdtrend(ctx, member: discord.Member = None):
+    if ctx.interaction and not ctx.interaction.response.is_done():
+        await ctx.interaction.response.defer(thinking=True)
+
+    member = member or ctx.author
+    epic = members.epic(member.id)
+    latest = stats_history.latest(member.id)
+    if not latest:
+        return await ctx.followup.send(f"❌ No stats history for {member.mention} yet. Check back after the next refresh.")
+
+    d = stats_history.delta(member.id)
+    embed = discord.Embed(title=f"📈 {epic or member.display_name} — Weekly Trend", color=discord.Color.blue())
+    embed.add_field(name="🔪 K/D", value=f"{latest['kd']}" + (f" ({d['kd']:+})" if d else ""))
+    embed.add_field(name="🏆 Wins", value=f"{latest['wins']}" + (f" ({d['wins']:+})" if d else ""))
+    embed.add_field(name="🎮 Matches", value=f"{latest['matches']}" + (f" ({d['matches']:+})" if d else ""))
+    embed.add_field(name="💀 Kills", value=f"{latest['kills']}" + (f" ({d['kills']:+})" if d else ""))
+    embed.add_field(name="🔥 Win Rate", value=f"{latest['winRate']}%" + (f" ({d['winRate']:+})" if d else ""))
+    embed.add_field(name="K/D Trend", value=f"`{stats_history.sparkline(member.id)}`", inline=False)
+    if not d:
+        embed.set_footer(text="Not enough history for a weekly delta yet.")
+    await ctx.followup.send(embed=embed)
+    await log_event(f"📈 /kdtrend used by {ctx.author} → {member}")
+
+@bot.hybrid_command(name="climbers", description="Show this week's biggest KD climbers")
+@profiled
+async def climbers(ctx):
+    if ctx.interaction and not ctx.interaction.response.is_done():
+        await ctx.interaction.response.defer(thinking=True)
+    embed = climbers_embed()
+    if not embed:
+        return await ctx.followup.send("❌ Not enough stats history for climbers yet.")
+    await ctx.followup.send(embed=embed)
+    await log_event("📈 Climbers panel requested")
+
 # ----------------------
 # Birthday System
 # ----------------------
 @bot.hybrid_command(name="setbirthday", description="Set your birthday (YYYY-MM-DD)")
+@profiled
 async def setbirthday(ctx, date: str):
     if ctx.interaction and not ctx.interaction.response.is_done():
         await ctx.interaction.response.defer(thinking=True)
     try:
         datetime.strptime(date, "%Y-%m-%d")
-        birthdays[str(ctx.author.id)] = date
-        save_json(BIRTHDAY_FILE, birthdays)
+        members.set_birthday(ctx.author.id, date)
+        members.save()
+        schedule_birthday(ctx.author.id)
         await ctx.followup.send(f"🎂 {ctx.author.mention}, birthday set to {date}")
         await log_event(f"🎂 Birthday set for {ctx.author} → {date}")
     except ValueError:
         await ctx.followup.send("❌ Invalid format. Use **YYYY-MM-DD**")
         await log_event(f"⚠️ Invalid birthday format by {ctx.author}")
 
-@tasks.loop(hours=24)
-async def check_birthdays():
-    today = datetime.utcnow().strftime("%m-%d")
-    for uid, dval in birthdays.items():
-        if dval[5:] == today and BIRTHDAY_CHANNEL_ID:
-            channel = bot.get_channel(BIRTHDAY_CHANNEL_ID)
-            if channel:
-                age = datetime.utcnow().year - int(dval[:4])
-                await channel.send(f"🎮 <@{uid}> has reached **Level {age}** today! 🎉")
-                await add_xp(int(uid), 500, channel)
-                await log_event(f"🎉 Birthday detected for <@{uid}> — Level {age}")
+@bot.hybrid_command(name="settimezone", description="Set your timezone (e.g. Europe/London) for birthday posts")
+@profiled
+async def settimezone(ctx, tz: str):
+    if ctx.interaction and not ctx.interaction.response.is_done():
+        await ctx.interaction.response.defer(thinking=True)
+    if not is_valid_zone(tz):
+        return await ctx.followup.send("❌ Unknown timezone. Use a name like **Europe/London** or **America/New_York**.")
+    members.set_tz(ctx.author.id, tz)
+    members.save()
+    schedule_birthday(ctx.author.id)
+    await ctx.followup.send(f"🕒 {ctx.author.mention}, timezone set to **{tz}**")
+    await log_event(f"🕒 Timezone set for {ctx.author} → {tz}")
+
+def schedule_birthday(uid):
+    """(Re)index a member's birthday in the calendar at local midnight."""
+    m = members.get(uid)
+    if not m or not m.birthday:
+        return
+    year, month, day = (int(part) for part in m.birthday.split("-"))
+    event_calendar.add(CalendarEvent(
+        f"birthday:{m.id}", "birthday", month, day, hour=0, tz=m.tz,
+        payload={"uid": m.id, "year": year},
+    ))
+
+@event_calendar.on("birthday")
+async def fire_birthday(event, local_day):
+    if not BIRTHDAY_CHANNEL_ID:
+        return
+    channel = bot.get_channel(BIRTHDAY_CHANNEL_ID)
+    if channel:
+        uid = event.payload["uid"]
+        age = local_day.year - event.payload["year"]
+        await channel.send(f"🎮 <@{uid}> has reached **Level {age}** today! 🎉")
+        await add_xp(uid, 500, channel)
+        await log_event(f"🎉 Birthday detected for <@{uid}> — Level {age}")
 
 # ----------------------
 # Tournament Commands
 # ----------------------
+TOURNAMENT_USAGE = (
+    "❌ Usage: /tournament join|leave|status <name>\n"
+    "Organisers: create <name> [capacity] [squad size] · add|remove <name> @players… · "
+    "bracket|squads <name> · report <name> @1st ; @2nd ; @3rd… (add `--override` to report again)"
+)
+MENTION_RE = re.compile(r"<@!?(\d+)>|\b(\d{15,20})\b")
+
+def parse_mentions(text: str) -> list[str]:
+    return [a or b for a, b in MENTION_RE.findall(text or "")]
+
+def tournament_kd(uid: str) -> float:
+    rec = kd_standings.records.get(str(uid))
+    return float(rec.get("kd", 0) or 0) if rec and not rec.get("missing") else 0.0
+
+def format_uids(uids, limit=40) -> str:
+    text = " ".join(f"<@{u}>" for u in uids[:limit])
+    return text + (f" … +{len(uids) - limit}" if len(uids) > limit else "")
+
 @bot.hybrid_command(name="tournament", description="Manage tournaments")
-async def tournament(ctx, action: str, name: str = None):
+@profiled
+async def tournament(ctx, action: str, name: str = None, *, details: str = ""):
     if ctx.interaction and not ctx.interaction.response.is_done():
         await ctx.interaction.response.defer(thinking=True)
 
+    action = action.lower()
     uid = str(ctx.author.id)
-    if action == "join" and name:
-        if name not in tournaments:
-            tournaments[name] = []
-        if uid not in tournaments[name]:
-            tournaments[name].append(uid)
-            save_json(TOURNAMENT_FILE, tournaments)
+    if not name:
+        return await ctx.followup.send(TOURNAMENT_USAGE)
+    perms = getattr(ctx.author, "guild_permissions", None)
+    if action in ("create", "add", "remove", "report") and not (perms and perms.manage_guild):
+        return await ctx.followup.send("❌ Only organisers (Manage Server) can do that.")
+    t = tournaments.get(name)
+    if t is None and action == "join":
+        t = tournaments.ensure(name)   # joining opens a tournament, as it always has
+    elif t is None and action != "create":
+        return await ctx.followup.send(
+            f"❌ No tournament called **{name}**. Organisers can set it up with `/tournament create {name}`."
+        )
+
+    if action == "join":
+        joined, waitlisted, _ = tournaments.join(name, [uid])
+        if joined:
             await ctx.followup.send(f"⚔️ {ctx.author.mention} joined **{name}**!")
             await log_event(f"⚔️ {ctx.author} joined tournament {name}")
+        elif waitlisted:
+            position = len(tournaments.get(name).waitlist)
+            await ctx.followup.send(f"⏳ **{name}** is full — {ctx.author.mention} is #{position} on the waitlist.")
+            await log_event(f"⏳ {ctx.author} waitlisted for tournament {name}")
         else:
             await ctx.followup.send(f"ℹ️ {ctx.author.mention}, you are already in **{name}**.")
-    elif action == "status" and name:
-        players = tournaments.get(name, [])
-        await ctx.followup.send(f"📋 Tournament **{name}**: {len(players)} players")
-        await log_event(f"📋 Tournament status checked: {name} — {len(players)} players")
+    elif action == "leave":
+        removed, promoted = tournaments.leave(name, [uid])
+        if not removed:
+            return await ctx.followup.send(f"ℹ️ {ctx.author.mention}, you aren't signed up for **{name}**.")
+        text = f"👋 {ctx.author.mention} left **{name}**."
+        if promoted:
+            text += f" {format_uids(promoted)} moved up from the waitlist!"
+        await ctx.followup.send(text)
+        await log_event(f"👋 {ctx.author} left tournament {name}")
+    elif action == "status":
+        cap = f"/{t.capacity}" if t.capacity else ""
+        wait = f", {len(t.waitlist)} waitlisted" if t.waitlist else ""
+        await ctx.followup.send(f"📋 Tournament **{name}**: {len(t.players)}{cap} players{wait}")
+        await log_event(f"📋 Tournament status checked: {name} — {len(t.players)} players")
+    elif action == "create":
+        numbers = [int(n) for n in details.split() if n.isdigit()]
+        capacity = numbers[0] if numbers and numbers[0] > 0 else None
+        squad_size = numbers[1] if len(numbers) > 1 else 1
+        t = tournaments.create(name, capacity, squad_size)
+        await ctx.followup.send(
+            f"🏟️ **{name}** ready — capacity {t.capacity or 'unlimited'}, squads of {t.squad_size}."
+        )
+        await log_event(f"🏟️ Tournament {name} set up by {ctx.author} (capacity {t.capacity}, squads {t.squad_size})")
+    elif action in ("add", "remove"):
+        uids = parse_mentions(details)
+        if not uids:
+            return await ctx.followup.send("❌ Mention the players to add or remove.")
+        if action == "add":
+            joined, waitlisted, already = tournaments.join(name, uids)
+            text = f"➕ **{name}**: {len(joined)} joined, {len(waitlisted)} waitlisted, {len(already)} already in."
+        else:
+            removed, promoted = tournaments.leave(name, uids)
+            text = f"➖ **{name}**: {len(removed)} removed, {len(promoted)} promoted from the waitlist."
+        await ctx.followup.send(text)
+        await log_event(f"🏟️ {ctx.author} bulk {action} on {name}: {text}")
+    elif action == "bracket":
+        pairs = tournaments.bracket(name, tournament_kd)
+        if not pairs:
+            return await ctx.followup.send(f"❌ **{name}** has no players yet.")
+        lines = [f"{i}. <@{a}> vs " + (f"<@{b}>" if b else "*bye*") for i, (a, b) in enumerate(pairs, 1)]
+        await ctx.followup.send(f"🗂️ **{name}** — round 1 (KD-seeded)\n" + "\n".join(lines[:50]))
+        await log_event(f"🗂️ Bracket generated for {name} ({len(pairs)} matches)")
+    elif action == "squads":
+        teams = tournaments.squads(name, tournament_kd)
+        if not teams:
+            return await ctx.followup.send(f"❌ **{name}** has no players yet.")
+        lines = [
+            f"**Squad {i}** ({sum(tournament_kd(u) for u in team):.2f} KD): {format_uids(team)}"
+            for i, team in enumerate(teams, 1)
+        ]
+        await ctx.followup.send(f"👥 **{name}** — balanced squads\n" + "\n".join(lines[:40]))
+        await log_event(f"👥 Squads generated for {name} ({len(teams)} squads)")
+    elif action == "report":
+        override = "--override" in details.split()
+        placements = [parse_mentions(group) for group in details.split(";")]
+        placements = [group for group in placements if group]
+        if not placements:
+            return await ctx.followup.send("❌ Mention the placings, best first, separated by `;`.")
+        awards = tournaments.report(name, placements, override=override)
+        if awards is None:
+            return await ctx.followup.send(
+                f"ℹ️ Results for **{name}** were already reported, so no XP was awarded again. "
+                f"Add `--override` to record another result."
+            )
+        for player, xp in awards.items():
+            queue_xp(int(player), xp, ctx.channel)   # applied together on the next drain
+        podium = "\n".join(f"{i}. {format_uids(group)}" for i, group in enumerate(placements[:3], 1))
+        await ctx.followup.send(
+            f"🏆 **{name}** results\n{podium}\n"
+            f"XP awarded to {len(awards)} players ({sum(awards.values()):,} total)."
+        )
+        await log_event(f"🏆 Results reported for {name} by {ctx.author}: {len(awards)} players awarded")
     else:
-        await ctx.followup.send("❌ Usage: /tournament join <name> | /tournament status <name>")
+        await ctx.followup.send(TOURNAMENT_USAGE)
         await log_event(f"⚠️ Invalid tournament command usage by {ctx.author}")
 
 # ----------------------
 # Winterfest Tournament (December only)
 # ----------------------
-@tasks.loop(hours=24)
-async def winterfest_challenge():
-    today = datetime.utcnow()
-    if today.month != 12:
-        return
+for _day in range(1, 32):
+    event_calendar.add(CalendarEvent(f"winterfest:{_day:02d}", "winterfest", 12, _day, hour=WINTERFEST_HOUR))
+
+@event_calendar.on("winterfest")
+async def winterfest_challenge(event, local_day):
     modes = ["Battle Royale", "Reload", "OG", "Blitz", "Zero Build"]
     squads = ["Solo", "Duos", "Trios", "Squads"]
     mode = random.choice(modes)
@@ -542,18 +984,18 @@ async def scan_message_history(limit_per_channel=None):
                     continue
                 uid = str(msg.author.id)
                 # XP for messages
-                await add_xp(msg.author.id, 5, channel)
+                queue_xp(msg.author.id, 5, channel)
                 # XP for reactions
                 for reaction in msg.reactions:
                     async for user in reaction.users():
                         if not user.bot:
-                            await add_xp(user.id, 10, channel)
+                            queue_xp(user.id, 10, channel)
                 # Catch legacy !linkepic
                 if msg.content.startswith("!linkepic") or msg.content.startswith("/linkepic"):
                     parts = msg.content.split(maxsplit=1)
                     if len(parts) > 1:
-                        epic_links[uid] = parts[1].strip()
-                        save_json(EPIC_FILE, epic_links)
+                        # ID from the cache if known; refresh_epic_ids backfills the rest
+                        members.set_epic(uid, parts[1].strip(), epic_ids.get(parts[1].strip()))
                         await log_event(f"🔗 Backscan linked Epic for {msg.author} → {parts[1].strip()}")
                 # Catch legacy !setbirthday
                 if msg.content.startswith("!setbirthday") or msg.content.startswith("/setbirthday"):
@@ -561,13 +1003,14 @@ async def scan_message_history(limit_per_channel=None):
                     if len(parts) > 1:
                         try:
                             datetime.strptime(parts[1].strip(), "%Y-%m-%d")
-                            birthdays[uid] = parts[1].strip()
-                            save_json(BIRTHDAY_FILE, birthdays)
+                            members.set_birthday(uid, parts[1].strip())
+                            schedule_birthday(uid)
                             await log_event(f"🎂 Backscan set birthday for {msg.author} → {parts[1].strip()}")
                         except ValueError:
                             pass
         except Exception as e:
             await log_event(f"⚠️ Could not scan {channel.name}: {e}")
+    members.flush()
 
 # ----------------------
 # Backscan + Health Check
@@ -576,15 +1019,15 @@ async def run_backscan():
     """Deep backscan across all channels: XP, links, birthdays, leaderboards"""
     try:
         await scan_message_history(limit_per_channel=None)
-        # Birthdays
-        await check_birthdays()
+        # Birthdays / calendar catch-up (idempotent)
+        await run_calendar_due()
         # KD leaderboard
-        img = await generate_kd_leaderboard(epic_links)
+        img = await generate_kd_leaderboard(members.epic_links())
         if img and leaderboard_channel():
             await leaderboard_channel().send("📊 Catch-up KD Leaderboard", file=discord.File(img))
             await log_event("📊 Backscan KD leaderboard refreshed.")
         # XP leaderboard (embed)
-        if xp_data and leaderboard_channel():
+        if members.has_xp() and leaderboard_channel():
             order = [
                 "UNREAL","CHAMPION","ELITE",
                 "DIAMOND III","DIAMOND II","DIAMOND I",
@@ -595,16 +1038,16 @@ async def run_backscan():
             ]
             embed = discord.Embed(title="🏆 Catch-up XP Leaderboard", color=discord.Color.purple())
             grouped = {rank: [] for rank in order}
-            for uid, xp in xp_data.items():
+            for uid, xp in members.xp_items():
                 rname = get_rank_role(assign_rank(xp))
                 if rname in grouped:
                     grouped[rname].append((uid, xp))
             for rname in order:
                 if grouped[rname]:
-                    members = sorted(grouped[rname], key=lambda x: x[1], reverse=True)
+                    ranked = sorted(grouped[rname], key=lambda x: x[1], reverse=True)
                     embed.add_field(
                         name=rname,
-                        value="\n".join([f"<@{u}> — {x} XP" for u, x in members]),
+                        value="\n".join([f"<@{u}> — {x} XP" for u, x in ranked]),
                         inline=False
                     )
             await leaderboard_channel().send(embed=embed)
@@ -614,6 +1057,7 @@ async def run_backscan():
         await log_event(f"⚠️ Backscan global error: {e}")
 
 @bot.hybrid_command(name="backscan", description="Run deep scan manually")
+@profiled
 async def backscan(ctx):
     if ctx.interaction and not ctx.interaction.response.is_done():
         await ctx.interaction.response.defer(thinking=True)
@@ -627,24 +1071,13 @@ async def backscan(ctx):
 async def run_self_maintenance():
     try:
         await scan_message_history(limit_per_channel=500)  # catch-up sample
-        await check_birthdays()
         # KD leaderboard
-        img = await generate_kd_leaderboard(epic_links)
+        img = await generate_kd_leaderboard(members.epic_links())
         if img and leaderboard_channel():
             await leaderboard_channel().send("📊 Self-maintenance KD Leaderboard", file=discord.File(img))
             await log_event("📊 Self-maintenance KD leaderboard refreshed.")
-        # Ensure QOTD
-        if qotd_data["questions"]:
-            available = [q for q in qotd_data["questions"] if q not in used_qotd]
-            if not available:
-                used_qotd.clear()
-                available = qotd_data["questions"]
-            q = random.choice(available)
-            used_qotd.append(q)
-            ch = bot.get_channel(QOTD_CHANNEL_ID)
-            if ch:
-                await ch.send(f"❓ <@&{CREW_ROLE_ID}> **QOTD (catch-up):** {q}")
-                await log_event(f"❓ Catch-up QOTD posted: {q}")
+        # Birthdays / Winterfest / QOTD catch-up (each fires at most once per day)
+        await run_calendar_due()
         # Podcast check
         if PODCAST_RSS_FEED and PODCAST_CHANNEL_ID:
             feed = feedparser.parse(PODCAST_RSS_FEED)
@@ -656,10 +1089,8 @@ async def run_self_maintenance():
                     await log_event(f"🎙️ Podcast check posted: {latest.title}")
         # Backup
         save_json(BACKUP_FILE, {
-            "xp": xp_data,
-            "epic": epic_links,
-            "birthdays": birthdays,
-            "tournaments": tournaments,
+            **members.legacy_dicts(),
+            "tournaments": tournaments.rosters(),
             "creator_maps": creator_maps
         })
         await log_event("💾 Self-maintenance backup saved.")
@@ -670,6 +1101,7 @@ async def run_self_maintenance():
             await logs_channel().send(f"⚠️ Self-maintenance error: {e}")
 
 @bot.hybrid_command(name="health", description="Health check (UptimeRobot)")
+@profiled
 async def health(ctx):
     if ctx.interaction and not ctx.interaction.response.is_done():
         await ctx.interaction.response.defer(thinking=True)
@@ -685,7 +1117,7 @@ async def health(ctx):
 # Creator Map Tracker
 # ----------------------
 async def fetch_creator_maps(creator_id):
-    url = f"https://fortnite-api.com/v1/creative/creatorcode/{creator_id}"
+    url = f"{FORTNITE_API_BASE}/v1/creative/creatorcode/{creator_id}"
     headers = {"Authorization": FORTNITE_API_KEY}
     try:
         async with aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=10)) as session:
@@ -697,6 +1129,7 @@ async def fetch_creator_maps(creator_id):
         return []
 
 @bot.hybrid_command(name="trackmaps", description="Track a Fortnite creator ID")
+@profiled
 async def trackmaps(ctx, creator_id: str):
     if creator_id not in creator_maps["tracked"]:
         if len(creator_maps["tracked"]) >= 25:
@@ -707,6 +1140,7 @@ async def trackmaps(ctx, creator_id: str):
     await send_reply(ctx, f"✅ Now tracking maps for **{creator_id}**")
 
 @tasks.loop(hours=1)
+@profiled
 async def check_creator_maps():
     ch = system_channel()
     for creator_id in creator_maps["tracked"]:
@@ -733,13 +1167,10 @@ async def check_creator_maps():
 # ----------------------
 # Fun Engagement Features
 # ----------------------
-@tasks.loop(hours=24)
-async def daily_qotd():
-    global last_qotd_date
-    today = date.today().isoformat()
-    if last_qotd_date == today:
-        await log_event("ℹ️ QOTD already posted today, skipping.")
-        return
+event_calendar.add(CalendarEvent("qotd", "qotd", DAILY, None, hour=QOTD_HOUR))
+
+@event_calendar.on("qotd")
+async def daily_qotd(event, local_day):
     if not qotd_data["questions"]:
         return
     available = [q for q in qotd_data["questions"] if q not in used_qotd]
@@ -752,9 +1183,9 @@ async def daily_qotd():
     if ch:
         await ch.send(f"❓ <@&{CREW_ROLE_ID}> **QOTD:** {q}")
         await log_event(f"❓ QOTD posted: {q}")
-        last_qotd_date = today
 
 @tasks.loop(hours=24)
+@profiled
 async def hidden_multiplier():
     global xp_multiplier
     if random.random() < 0.2:
@@ -768,41 +1199,198 @@ async def hidden_multiplier():
         await log_event("ℹ️ XP multiplier reset to 1x")
 
 @tasks.loop(hours=6)
+@profiled
 async def loot_drop():
-    if random.random() < 0.3:
-        ch = system_channel()
-        if ch:
-            await ch.send(
-                f"🎁 <@&{CREW_ROLE_ID}> A loot chest appeared! "
-                f"Type `!claim` in 5 hours to open it! Winner gets **10,000 XP**!"
-            )
-            await log_event("🎁 Loot chest spawned.")
-            def check(m): return m.content.lower() == "!claim" and m.channel == ch
-            try:
-                m = await bot.wait_for("message", timeout=18000, check=check)  # 5h
-                await add_xp(m.author.id, 10000, ch)
-                await ch.send(f"🎉 {m.author.mention} claimed the chest and earned **10,000 XP!**")
-                await log_event(f"🏆 Loot chest claimed by {m.author}")
-            except asyncio.TimeoutError:
-                await ch.send("⌛ The loot chest vanished...")
-                await log_event("⌛ Loot chest expired.")
+    if random.random() >= 0.3 or len(drop_engine.active(CHEST)) >= MAX_LOOT_DROPS:
+        return
+    ch = system_channel()
+    if not ch:
+        return
+    drop = drop_engine.spawn(CHEST, LOOT_DROP_HOURS * 3600, LOOT_DROP_XP, channel_id=ch.id)
+    try:
+        msg = await ch.send(
+            f"🎁 <@&{CREW_ROLE_ID}> A loot chest appeared! "
+            f"First to open it in the next {LOOT_DROP_HOURS:g} hours wins **{LOOT_DROP_XP:,} XP**!",
+            view=chest_view(drop.id),
+        )
+    except discord.HTTPException as e:
+        # Nobody can see it, so don't let it hold a slot; re-raising would stop the loop
+        drop_engine.discard(drop.id)
+        print(f"⚠️ Loot chest {drop.id} not posted: {e}")
+        return
+    drop_engine.attach_message(drop.id, msg.id)
+    await log_event(f"🎁 Loot chest {drop.id} spawned.")
 
 @tasks.loop(hours=720)  # ~monthly
+@profiled
 async def secret_challenge():
     if not bot.guilds:
         return
     guild = bot.guilds[0]
-    member = random.choice([m for m in guild.members if not m.bot])
+    member = await random_member(guild, MEMBER_CACHE_POLICY, lambda m: not m.bot)
+    if member is None:
+        return
+    try:
+        await member.send(
+            f"🤫 **Secret Mission:** Post a Fortnite clip in the server within {MISSION_HOURS:g} hours "
+            f"and you’ll earn {MISSION_XP} bonus XP!"
+        )
+    except Exception:
+        return await log_event("⚠️ Secret mission DM failed to deliver")
+    drop_engine.spawn(MISSION, MISSION_HOURS * 3600, MISSION_XP, user_id=member.id)
+    await log_event(f"🤫 Secret mission DM sent to {member}")
+
+def chest_view(drop_id):
+    """Claim button; handled by on_interaction so it keeps working after a restart."""
+    view = discord.ui.View(timeout=None)
+    view.add_item(discord.ui.Button(label="Open chest", emoji="🎁", style=discord.ButtonStyle.success,
+                                    custom_id=f"drop:{drop_id}"))
+    return view
+
+def credit_drop(drop, member_id) -> int:
+    """Apply and persist a claimed drop's XP before any Discord call can fail."""
+    total = members.add_xp(member_id, drop.reward * xp_multiplier)
+    members.save()
+    return total
+
+async def announce_drop(drop, member, channel, total):
+    """Rank role + announcements; best effort, the XP is already credited."""
     try:
-        await member.send("🤫 **Secret Mission:** Post a Fortnite clip today and you’ll earn 100 bonus XP!")
-        await log_event(f"🤫 Secret mission DM sent to {member}")
-    except:
-        await log_event("⚠️ Secret mission DM failed to deliver")
+        await sync_rank_role(member.id, total, channel, member)
+        if drop.kind == CHEST:
+            await channel.send(f"🎉 {member.mention} claimed the chest and earned **{drop.reward:,} XP!**")
+            await log_event(f"🏆 Loot chest {drop.id} claimed by {member}")
+        else:
+            await channel.send(f"🤫 {member.mention} completed a secret mission! **+{drop.reward} XP**")
+            await log_event(f"🤫 Secret mission completed by {member}")
+    except discord.HTTPException as e:
+        print(f"⚠️ Drop {drop.id} announcement failed: {e}")
+
+async def handle_drop_message(message):
+    """Only called for channels with a live chest or members with an open mission."""
+    if message.content.strip().lower() == "!claim":
+        drop = drop_engine.claim_in_channel(message.channel.id, message.author.id)
+        if drop:
+            total = credit_drop(drop, message.author.id)
+            await close_chest_message(message.channel, drop, f"🎁 Opened by {message.author.mention}")
+            await announce_drop(drop, message.author, message.channel, total)
+    mission = drop_engine.mission_for(message.author.id)
+    if mission and message.guild and is_clip(message):
+        drop = drop_engine.claim(mission.id, message.author.id)
+        if drop:
+            total = credit_drop(drop, message.author.id)
+            await announce_drop(drop, message.author, message.channel, total)
+
+async def close_chest_message(channel, drop, content):
+    if not drop.message_id or channel is None:
+        return
+    try:
+        msg = await channel.fetch_message(drop.message_id)
+        await msg.edit(content=content, view=None)
+    except discord.HTTPException:
+        pass
+
+@bot.listen("on_interaction")
+async def on_drop_interaction(interaction):
+    custom_id = (interaction.data or {}).get("custom_id", "")
+    if interaction.type != discord.InteractionType.component or not custom_id.startswith("drop:"):
+        return
+    drop = drop_engine.claim(custom_id[5:], interaction.user.id)
+    try:
+        if drop is None:
+            return await interaction.response.send_message("⌛ Too late — this chest is already gone.", ephemeral=True)
+        total = credit_drop(drop, interaction.user.id)
+        await interaction.response.edit_message(content=f"🎁 Opened by {interaction.user.mention}", view=None)
+    except discord.HTTPException:   # expired/unknown interaction: the claim and XP still stand
+        if drop is None:
+            return
+        await close_chest_message(interaction.channel, drop, f"🎁 Opened by {interaction.user.mention}")
+    await announce_drop(drop, interaction.user, interaction.channel, total)
+
+@tasks.loop(seconds=30)
+@profiled
+async def expire_drops():
+    for drop in drop_engine.expire():
+        if drop.kind == CHEST:
+            ch = bot.get_channel(drop.channel_id)
+            await close_chest_message(ch, drop, "⌛ The loot chest vanished...")
+            await log_event(f"⌛ Loot chest {drop.id} expired.")
+        else:
+            await log_event(f"⌛ Secret mission for <@{drop.user_id}> expired.")
+
+@bot.hybrid_command(name="addevent", description="Schedule a yearly custom event (MM-DD HH, UTC)")
+@profiled
+@commands.has_permissions(manage_guild=True)
+async def addevent(ctx, when: str, hour: int, *, message: str):
+    if ctx.interaction and not ctx.interaction.response.is_done():
+        await ctx.interaction.response.defer(thinking=True)
+    try:
+        parsed = datetime.strptime(f"2000-{when}", "%Y-%m-%d")
+    except ValueError:
+        return await ctx.followup.send("❌ Invalid date. Use **MM-DD**, e.g. `12-25`.")
+    if not 0 <= hour <= 23:
+        return await ctx.followup.send("❌ Hour must be 0–23 (UTC).")
+    event_id = f"custom:{parsed.month:02d}-{parsed.day:02d}-{hour:02d}:{ctx.channel.id}"
+    event_calendar.add(CalendarEvent(
+        event_id, "custom", parsed.month, parsed.day, hour=hour,
+        payload={"message": message, "channel_id": ctx.channel.id},
+    ), persist=True)
+    event_calendar.save()
+    await ctx.followup.send(f"📅 Event scheduled every **{when}** at **{hour:02d}:00 UTC** in this channel.")
+    await log_event(f"📅 Custom event {event_id} added by {ctx.author}")
+
+def custom_events():
+    return [event_calendar.events[i] for i in sorted(event_calendar.custom) if i in event_calendar.events]
+
+@bot.hybrid_command(name="listevents", description="List scheduled custom events")
+@profiled
+async def listevents(ctx):
+    if ctx.interaction and not ctx.interaction.response.is_done():
+        await ctx.interaction.response.defer(thinking=True)
+    events = custom_events()
+    if not events:
+        return await ctx.followup.send("📅 No custom events scheduled.")
+    lines = [
+        f"**{i}.** {e.month:02d}-{e.day:02d} {e.hour:02d}:00 UTC in <#{e.payload.get('channel_id', 0)}> — "
+        f"{e.payload.get('message', '')[:80]}"
+        for i, e in enumerate(events, start=1)
+    ]
+    await ctx.followup.send("📅 **Custom Events:**\n" + "\n".join(lines))
+    await log_event(f"📅 Custom events listed by {ctx.author}")
+
+@bot.hybrid_command(name="removeevent", description="Remove a custom event (number from /listevents)")
+@profiled
+@commands.has_permissions(manage_guild=True)
+async def removeevent(ctx, number: int):
+    if ctx.interaction and not ctx.interaction.response.is_done():
+        await ctx.interaction.response.defer(thinking=True)
+    events = custom_events()
+    if not 1 <= number <= len(events):
+        return await ctx.followup.send("❌ No event with that number. Check **/listevents**.")
+    event = events[number - 1]
+    event_calendar.remove(event.id)
+    await ctx.followup.send(f"🗑️ Removed the **{event.month:02d}-{event.day:02d}** event.")
+    await log_event(f"🗑️ Custom event {event.id} removed by {ctx.author}")
+
+@event_calendar.on("custom")
+async def fire_custom_event(event, local_day):
+    ch = bot.get_channel(event.payload.get("channel_id", 0)) or system_channel()
+    if ch:
+        await ch.send(f"📅 {event.payload.get('message', '')}")
+        await log_event(f"📅 Custom event fired: {event.id}")
+
+async def _log_calendar_error(event, error):
+    await log_event(f"⚠️ Calendar event {event.id} failed: {error}")
+
+async def run_calendar_due():
+    """Fire anything due right now; safe to call repeatedly."""
+    await event_calendar.run_due(on_error=_log_calendar_error)
 
 # ----------------------
 # Podcast Autoposter
 # ----------------------
 @tasks.loop(hours=12)
+@profiled
 async def check_podcast():
     if not PODCAST_RSS_FEED or not PODCAST_CHANNEL_ID:
         return
@@ -819,21 +1407,222 @@ async def check_podcast():
 # Daily Backup
 # ----------------------
 @tasks.loop(hours=24)
+@profiled
 async def daily_backup():
     save_json(BACKUP_FILE, {
-        "xp": xp_data,
-        "epic": epic_links,
-        "birthdays": birthdays,
-        "tournaments": tournaments,
+        **members.legacy_dicts(),
+        "tournaments": tournaments.rosters(),
         "creator_maps": creator_maps
     })
-    await log_event("💾 Daily backup completed")
+    dropped = stats_history.compact()
+    await log_event(f"💾 Daily backup completed (stats history compacted, {dropped} old snapshots dropped)")
+
+# ----------------------
+# State Export / Import (admin only)
+# ----------------------
+def commit_imported_state():
+    members.flush()
+    tournaments.save()
+    save_json(CREATOR_FILE, creator_maps)
+
+@bot.hybrid_command(name="exportstate", description="Admin: export XP, links, birthdays, tournaments + creator maps")
+@profiled
+@commands.has_permissions(administrator=True)
+async def exportstate(ctx):
+    if ctx.interaction and not ctx.interaction.response.is_done():
+        await ctx.interaction.response.defer(thinking=True, ephemeral=True)
+    stamp = datetime.now(timezone.utc).strftime("%Y%m%d-%H%M")
+    path = os.path.join(tempfile.gettempdir(), f"sweeper-state-{stamp}.ndjson.gz")
+    try:
+        count = await state_transfer.export_state_async(path, members, tournaments, creator_maps)
+        await ctx.followup.send(f"📦 Exported {count} records.", file=discord.File(path))
+        await log_event(f"📦 State exported by {ctx.author} ({count} records)")
+    finally:
+        if os.path.exists(path):
+            os.remove(path)
+
+@bot.hybrid_command(name="importstate", description="Admin: import a state export (mode: merge | replace)")
+@profiled
+@commands.has_permissions(administrator=True)
+async def importstate(ctx, archive: discord.Attachment, mode: str = "merge", resume: bool = False):
+    if ctx.interaction and not ctx.interaction.response.is_done():
+        await ctx.interaction.response.defer(thinking=True, ephemeral=True)
+    if mode not in ("merge", "replace"):
+        return await ctx.followup.send("❌ Mode must be **merge** or **replace**.")
+    # Keep the upload under a stable name so an interrupted import can resume
+    suffix = ".json" if archive.filename.endswith(".json") else (
+        ".ndjson.gz" if archive.filename.endswith(".gz") else ".ndjson")
+    safe_name = "".join(ch for ch in archive.filename if ch.isalnum() or ch in "-_")[:40]
+    path = os.path.join(tempfile.gettempdir(), f"sweeper-import-{safe_name}-{archive.size}{suffix}")
+    if not os.path.exists(path):
+        await archive.save(path)
+    result = await state_transfer.import_state_async(
+        path, members, tournaments, creator_maps, commit_imported_state, mode=mode, resume=resume
+    )
+    for uid in members.birthdays():
+        schedule_birthday(uid)
+    os.remove(path)
+    lines = [f"📥 Import ({mode}): {result.summary()}"]
+    lines += [f"• line {line}: {error}" for line, error in result.errors[:10]]
+    await ctx.followup.send("\n".join(lines))
+    await log_event(f"📥 State imported by {ctx.author}: {result.summary()}")
+
+# ----------------------
+# JSON API Snapshots (served by keep_alive.py)
+# ----------------------
+def build_api_snapshots():
+    """Plain-data copies of the leaderboards, profiles and rosters for the web thread."""
+    xp_ranked = sorted(members.xp_items(), key=lambda item: item[1], reverse=True)
+    xp_rows = [
+        {"uid": str(uid), "xp": xp, "position": i, "rank": get_rank_role(assign_rank(xp))}
+        for i, (uid, xp) in enumerate(xp_ranked, start=1)
+    ]
+
+    kd_ranked = sorted(
+        ((uid, rec) for uid, rec in kd_standings.records.items() if not rec.get("missing")),
+        key=lambda item: (item[1].get("kd", 0), item[1].get("wins", 0)), reverse=True,
+    )
+    kd_rows = [
+        {"uid": uid, "position": i, "username": rec.get("username"), "kd": rec.get("kd", 0),
+         "wins": rec.get("wins", 0), "matches": rec.get("matches", 0), "winRate": rec.get("winRate", 0.0)}
+        for i, (uid, rec) in enumerate(kd_ranked, start=1)
+    ]
+    kd_by_uid = {row["uid"]: row for row in kd_rows}
+
+    # Profiles: public fields only (no birthdays / timezones)
+    xp_by_uid = {row["uid"]: row for row in xp_rows}
+    joined = {}
+    for name, t in tournaments.tournaments.items():
+        for player in t.players:
+            joined.setdefault(player, []).append(name)
+    profiles = {}
+    for m in members.members.values():
+        uid = str(m.id)
+        if not (m.xp or m.epic):
+            continue
+        xp_row = xp_by_uid.get(uid)
+        profiles[uid] = {
+            "uid": uid,
+            "xp": m.xp,
+            "rank": get_rank_role(assign_rank(m.xp)),
+            "xp_position": xp_row["position"] if xp_row else None,
+            "epic": m.epic,
+            "kd": kd_by_uid.get(uid),
+            "weekly": stats_history.delta(m.id),
+            "tournaments": joined.get(uid, []),
+        }
+
+    rosters = {
+        name: {"name": name, "players": list(t.players), "count": len(t.players),
+               "capacity": t.capacity, "squad_size": t.squad_size, "waitlist": list(t.waitlist)}
+        for name, t in tournaments.tournaments.items()
+    }
+    return {
+        "xp": (xp_rows, None),
+        "kd": (kd_rows, None),
+        "profiles": (None, profiles),
+        "tournaments": (list(rosters.values()), rosters),
+    }
+
+@tasks.loop(seconds=API_SNAPSHOT_SECONDS)
+@profiled
+async def publish_api_snapshots():
+    for name, (items, index) in build_api_snapshots().items():
+        api_snapshots.snapshots.publish(name, items, index)
+
+# ----------------------
+# Profiling (admin only)
+# ----------------------
+_last_lag_alert = 0.0
+
+def _on_loop_lag(lag, stack):
+    """Called from the lag-monitor thread; forwards at most one alert a minute."""
+    global _last_lag_alert
+    now = time.monotonic()
+    if now - _last_lag_alert < 60 or not bot.loop:
+        return
+    _last_lag_alert = now
+    where = stack.strip().splitlines()[-2].strip() if stack else "unknown"
+    asyncio.run_coroutine_threadsafe(
+        log_event(f"🐢 Event loop blocked for {lag * 1000:.0f} ms at `{where}`"), bot.loop
+    )
+
+def member_cache_report():
+    rss = rss_mb()
+    return (
+        f"member cache policy {MEMBER_CACHE_POLICY}: {cached_member_count(bot.guilds)} members cached, "
+        f"RSS {f'{rss:.1f} MiB' if rss is not None else 'n/a'}"
+    )
+
+lag_monitor = LagMonitor(threshold=LOOP_LAG_MS / 1000, on_lag=_on_loop_lag)
+
+@bot.hybrid_command(name="xplimits", description="Admin: view or set XP rate limits (rate/burst/dupwindow/channel)")
+@profiled
+@commands.has_permissions(manage_guild=True)
+async def xplimits(ctx, setting: str = "show", value: float = None, channel: discord.TextChannel = None):
+    if ctx.interaction and not ctx.interaction.response.is_done():
+        await ctx.interaction.response.defer(thinking=True, ephemeral=True)
+    gid = ctx.guild.id if ctx.guild else 0
+    setting = setting.lower()
+    if setting in ("rate", "burst", "dupwindow") and value is not None and value >= 0:
+        field = {"rate": "rate", "burst": "burst", "dupwindow": "dup_window"}[setting]
+        xp_guard.set_limits(gid, **{field: value / 60 if setting == "rate" else value})
+    elif setting == "channel" and channel is not None:
+        xp_guard.set_channel_weight(gid, channel.id, value)
+    elif setting == "reset":
+        xp_guard.guild_limits.pop(str(gid), None)
+        xp_guard.save()
+    elif setting != "show":
+        return await ctx.followup.send(
+            "❌ Usage: /xplimits show | rate <events/min> | burst <n> | dupwindow <seconds> | "
+            "channel <weight> #channel | reset"
+        )
+    lim = xp_guard.limits_for(gid)
+    weights = ", ".join(f"<#{cid}> ×{w:g}" for cid, w in lim.channel_weights.items()) or "none"
+    await ctx.followup.send(
+        f"🛡️ XP limits: {lim.rate * 60:g} events/min, burst {lim.burst:g}, "
+        f"duplicate window {lim.dup_window:g}s\nChannel weights: {weights}\n{xp_guard.report()}"
+    )
+    if setting != "show":
+        await log_event(f"🛡️ XP limits changed by {ctx.author}: {setting} {value if value is not None else ''}".rstrip())
+
+@bot.hybrid_command(name="profile", description="Admin: stats | slowlog | cprofile | tasks (N seconds)")
+@profiled
+@commands.has_permissions(administrator=True)
+async def profile(ctx, action: str = "stats", seconds: int = 10):
+    if ctx.interaction and not ctx.interaction.response.is_done():
+        await ctx.interaction.response.defer(thinking=True, ephemeral=True)
+    seconds = max(1, min(seconds, 120))
+    if action == "stats":
+        report = profiling.summary(top=40) + (
+            f"\n\n{member_cache_report()}, {len(active_members)} in active LRU "
+            f"(hits {active_members.hits}, misses {active_members.misses})"
+        ) + (
+            f"\n\nloop stalls: {lag_monitor.stalls}, worst lag: {lag_monitor.max_lag * 1000:.0f} ms"
+            f"\nxp queue: {xp_batcher.events_in} events in {xp_batcher.batches} batches, "
+            f"largest batch {xp_batcher.max_batch_users} members, {len(xp_batcher)} pending"
+            f"\n{xp_guard.report()}"
+        )
+    elif action == "slowlog":
+        report = profiling.slow_report()
+    elif action == "cprofile":
+        await ctx.followup.send(f"⏱️ Profiling the event loop for {seconds}s…")
+        report = await profiling.cprofile_for(seconds)
+    elif action == "tasks":
+        await ctx.followup.send(f"⏱️ Sampling asyncio tasks for {seconds}s…")
+        report = await profiling.task_dump_for(seconds)
+    else:
+        return await ctx.followup.send("❌ Usage: /profile stats|slowlog|cprofile|tasks [seconds]")
+    buf = io.BytesIO(report.encode("utf-8"))
+    await ctx.followup.send(file=discord.File(buf, filename=f"profile-{action}.txt"))
+    await log_event(f"⏱️ /profile {action} run by {ctx.author}")
 
 # ----------------------
 # Events
 # ----------------------
 @bot.event
 async def on_ready():
+    global calendar_task
     print(f"✅ Logged in as {bot.user}")
 
     # Try to sync commands
@@ -848,27 +1637,37 @@ async def on_ready():
         if logs_channel():
             await logs_channel().send(f"⚠️ Sync error: {e}")
 
+    await log_event(f"🧠 {member_cache_report()}")
+
     # Start background tasks
+    lag_monitor.start(asyncio.get_running_loop())
+    drain_xp_queue.start()
+    flush_members.start()
+    refresh_kd_standings.start()
+    refresh_epic_ids.start()
+    publish_api_snapshots.start()
     autopost_leaderboard.start()
-    check_birthdays.start()
     daily_backup.start()
     check_creator_maps.start()
     check_podcast.start()
-    daily_qotd.start()
     hidden_multiplier.start()
     loot_drop.start()
+    expire_drops.start()
     secret_challenge.start()
-    winterfest_challenge.start()
+    if calendar_task is None or calendar_task.done():
+        for uid in members.birthdays():
+            schedule_birthday(uid)
+        calendar_task = asyncio.create_task(event_calendar.run_forever(on_error=_log_calendar_error))
 
     # Generate KD and XP leaderboard on startup (redeploy test)
-    img = await generate_kd_leaderboard(epic_links)
+    img = await generate_kd_leaderboard(members.epic_links())
     if img and leaderboard_channel():
         await leaderboard_channel().send("📊 Startup KD Leaderboard", file=discord.File(img))
         await log_event("📊 KD leaderboard generated on startup")
     else:
         await log_event("ℹ️ Startup KD leaderboard not generated (no data/image).")
 
-    if xp_data and leaderboard_channel():
+    if members.has_xp() and leaderboard_channel():
         order = [
             "UNREAL","CHAMPION","ELITE",
             "DIAMOND III","DIAMOND II","DIAMOND I",
@@ -879,16 +1678,16 @@ async def on_ready():
         ]
         embed = discord.Embed(title="🏆 Startup XP Leaderboard", color=discord.Color.purple())
         grouped = {rank: [] for rank in order}
-        for uid, xp in xp_data.items():
+        for uid, xp in members.xp_items():
             rname = get_rank_role(assign_rank(xp))
             if rname in grouped:
                 grouped[rname].append((uid, xp))
         for rname in order:
             if grouped[rname]:
-                members = sorted(grouped[rname], key=lambda x: x[1], reverse=True)
+                ranked = sorted(grouped[rname], key=lambda x: x[1], reverse=True)
                 embed.add_field(
                     name=rname,
-                    value="\n".join([f"<@{u}> — {x} XP" for u, x in members]),
+                    value="\n".join([f"<@{u}> — {x} XP" for u, x in ranked]),
                     inline=False
                 )
         await leaderboard_channel().send(embed=embed)
@@ -897,5 +1696,10 @@ async def on_ready():
 # ----------------------
 # Start
 # ----------------------
-keep_alive()
-bot.run(DISCORD_TOKEN)
+if __name__ == "__main__":
+    keep_alive()
+    signal.signal(signal.SIGTERM, _stop_on_sigterm)
+    try:
+        bot.run(DISCORD_TOKEN)
+    finally:
+        save_state_on_exit()
@@ -0,0 +1,112 @@
+# member_cache.py
+# ======================
+# Member-cache policy + on-demand member lookups
+# ======================
+# MEMBER_CACHE_POLICY:
+#   full   - discord.py keeps every member (chunked at startup); old behaviour
+#   active - no gateway member cache; recently active members live in a
+#            small LRU, everyone else is fetched on demand
+#   none   - no member cache at all; every lookup is a targeted fetch
+# Random selection streams members through a reservoir sampler instead of
+# building a list of the whole guild.
+
+import os
+import random
+from collections import OrderedDict
+
+import discord
+
+POLICIES = ("full", "active", "none")
+
+
+def cache_settings(policy: str) -> dict:
+    """Keyword arguments for commands.Bot for the given policy."""
+    if policy == "full":
+        return {"member_cache_flags": discord.MemberCacheFlags.all(), "chunk_guilds_at_startup": True}
+    return {"member_cache_flags": discord.MemberCacheFlags.none(), "chunk_guilds_at_startup": False}
+
+
+class ActiveMembers:
+    """LRU of recently active members (only used by the "active" policy)."""
+
+    def __init__(self, capacity: int = 500, enabled: bool = True):
+        self.capacity = capacity
+        self.enabled = enabled and capacity > 0
+        self._lru = OrderedDict()   # (guild id, member id) -> Member
+        self.hits = 0
+        self.misses = 0
+
+    def touch(self, member):
+        if not self.enabled or not isinstance(member, discord.Member):
+            return
+        key = (member.guild.id, member.id)
+        self._lru[key] = member
+        self._lru.move_to_end(key)
+        if len(self._lru) > self.capacity:
+            self._lru.popitem(last=False)
+
+    def get(self, guild_id: int, member_id: int):
+        member = self._lru.get((guild_id, member_id))
+        if member is not None:
+            self._lru.move_to_end((guild_id, member_id))
+        return member
+
+    def forget(self, guild_id: int, member_id: int):
+        self._lru.pop((guild_id, member_id), None)
+
+    def __len__(self):
+        return len(self._lru)
+
+
+async def resolve_member(guild, member_id: int, active: ActiveMembers | None = None):
+    """Cache first, then the active LRU, then a targeted API fetch."""
+    member_id = int(member_id)
+    member = guild.get_member(member_id)
+    if member is not None:
+        return member
+    if active is not None:
+        member = active.get(guild.id, member_id)
+        if member is not None:
+            active.hits += 1
+            return member
+        active.misses += 1
+    try:
+        member = await guild.fetch_member(member_id)
+    except discord.HTTPException:   # NotFound / Forbidden / 5xx: treat as unavailable
+        return None
+    if active is not None:
+        active.touch(member)
+    return member
+
+
+async def random_member(guild, policy: str, predicate=lambda m: True, rng=random):
+    """Uniformly pick one member matching `predicate` without materialising the guild."""
+    chosen, seen = None, 0
+    if policy == "full":
+        source = guild.members
+        for m in source:
+            if predicate(m):
+                seen += 1
+                if rng.randrange(seen) == 0:
+                    chosen = m
+        return chosen
+    async for m in guild.fetch_members(limit=None):
+        if predicate(m):
+            seen += 1
+            if rng.randrange(seen) == 0:
+                chosen = m
+    return chosen
+
+
+def cached_member_count(guilds) -> int:
+    return sum(len(g.members) for g in guilds)
+
+
+def rss_mb() -> float | None:
+    """Resident set size of this process in MiB (Linux), or None."""
+    try:
+        with open("/proc/self/statm", "r") as f:
+            pages = int(f.read().split()[1])
+        return pages * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024)
+    except (OSError, ValueError, IndexError):
+        return None
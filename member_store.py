@@ -0,0 +1,184 @@
+# member_store.py
+# ======================
+# Unified per-member state (XP, Epic link, birthday, daily claim)
+# ======================
+# One slotted record per member keyed by the integer Discord ID, instead
+# of four parallel dicts keyed by stringified snowflakes. Saved as a
+# column header + row lists so keys aren't repeated per member. Legacy
+# xp_data.json / epic_links.json / birthdays.json / daily_claims.json are
+# migrated on first load.
+
+import os
+import json
+from datetime import date
+
+from storage import save_json
+
+MEMBERS_FILE = "data/members.json"
+FORMAT_VERSION = 1
+
+
+class Member:
+    __slots__ = ("id", "xp", "epic", "birthday", "daily_claim", "tz", "epic_id", "epic_checked")
+
+    def __init__(self, id: int, xp: int = 0, epic: str | None = None,
+                 birthday: str | None = None, daily_claim: int = 0, tz: str | None = None,
+                 epic_id: str | None = None, epic_checked: int = 0):
+        self.id = id
+        self.xp = xp
+        self.epic = epic                # Epic display name or None
+        self.birthday = birthday        # "YYYY-MM-DD" or None
+        self.daily_claim = daily_claim  # date.toordinal() of last /daily, 0 = never
+        self.tz = tz                    # IANA timezone name or None (UTC)
+        self.epic_id = epic_id          # resolved Epic account ID or None
+        self.epic_checked = epic_checked  # unix time of the last background ID/rename check
+
+    def is_empty(self) -> bool:
+        return not (self.xp or self.epic or self.birthday or self.daily_claim or self.tz)
+
+
+COLUMNS = Member.__slots__
+
+
+class MemberStore:
+    def __init__(self, path: str = MEMBERS_FILE):
+        self.path = path
+        self.members = {}   # int id -> Member
+        self.dirty = False
+
+    def __len__(self):
+        return len(self.members)
+
+    def __contains__(self, member_id):
+        return int(member_id) in self.members
+
+    # ---------- persistence ----------
+    def load(self, legacy: dict | None = None):
+        """
+        Load the members file. If it doesn't exist yet, build the store from
+        the legacy per-field JSON files ({"xp": path, "epic": path, ...}).
+        """
+        if os.path.exists(self.path):
+            with open(self.path, "r") as f:
+                blob = json.load(f)
+            cols = blob["columns"]
+            for row in blob["rows"]:
+                m = Member(**dict(zip(cols, row)))
+                self.members[m.id] = m
+        elif legacy:
+            self._migrate(legacy)
+            self.save()
+        return self
+
+    def _migrate(self, legacy: dict):
+        def read(key):
+            path = legacy.get(key)
+            if not path or not os.path.exists(path):
+                return {}
+            with open(path, "r") as f:
+                return json.load(f)
+
+        for uid, xp in read("xp").items():
+            self.ensure(uid).xp = int(xp)
+        for uid, epic in read("epic").items():
+            self.ensure(uid).epic = epic
+        for uid, bday in read("birthday").items():
+            self.ensure(uid).birthday = bday
+        for uid, day in read("daily_claim").items():
+            try:
+                self.ensure(uid).daily_claim = date.fromisoformat(day).toordinal()
+            except ValueError:
+                pass
+
+    def save(self):
+        rows = [[getattr(m, c) for c in COLUMNS] for m in self.members.values() if not m.is_empty()]
+        save_json(self.path, {"version": FORMAT_VERSION, "columns": list(COLUMNS), "rows": rows},
+                  indent=None, separators=(",", ":"))
+        self.dirty = False
+
+    def flush(self):
+        """Save only if something changed since the last save."""
+        if self.dirty:
+            self.save()
+
+    # ---------- records ----------
+    def get(self, member_id) -> Member | None:
+        return self.members.get(int(member_id))
+
+    def ensure(self, member_id) -> Member:
+        member_id = int(member_id)
+        m = self.members.get(member_id)
+        if m is None:
+            m = self.members[member_id] = Member(member_id)
+        return m
+
+    def add_xp(self, member_id, amount: int) -> int:
+        m = self.ensure(member_id)
+        m.xp += amount
+        self.dirty = True
+        return m.xp
+
+    def xp(self, member_id) -> int:
+        m = self.members.get(int(member_id))
+        return m.xp if m else 0
+
+    def set_epic(self, member_id, epic: str, epic_id: str | None = None):
+        m = self.ensure(member_id)
+        m.epic = epic
+        m.epic_id = epic_id
+        self.dirty = True
+
+    def clear_epic_id(self, epic_id: str) -> int:
+        """Forget a dead account ID so the next lookup goes by name."""
+        cleared = 0
+        for m in self.members.values():
+            if m.epic_id == epic_id:
+                m.epic_id = None
+                cleared += 1
+        if cleared:
+            self.dirty = True
+        return cleared
+
+    def epic(self, member_id) -> str | None:
+        m = self.members.get(int(member_id))
+        return m.epic if m else None
+
+    def set_birthday(self, member_id, bday: str):
+        self.ensure(member_id).birthday = bday
+        self.dirty = True
+
+    def set_tz(self, member_id, tz: str | None):
+        self.ensure(member_id).tz = tz
+        self.dirty = True
+
+    def claim_daily(self, member_id, today: date) -> bool:
+        """Record today's /daily claim. Returns False if already claimed."""
+        m = self.ensure(member_id)
+        if m.daily_claim == today.toordinal():
+            return False
+        m.daily_claim = today.toordinal()
+        self.dirty = True
+        return True
+
+    # ---------- views ----------
+    def xp_items(self):
+        """(id, xp) for every member with XP."""
+        return ((m.id, m.xp) for m in self.members.values() if m.xp)
+
+    def has_xp(self) -> bool:
+        return any(m.xp for m in self.members.values())
+
+    def epic_links(self) -> dict:
+        """{str(id): epic} snapshot of linked members (the shape KD code uses)."""
+        return {str(m.id): m.epic for m in self.members.values() if m.epic}
+
+    def birthdays(self) -> dict:
+        return {str(m.id): m.birthday for m in self.members.values() if m.birthday}
+
+    def legacy_dicts(self) -> dict:
+        """String-keyed per-field dicts, as written to backup.json."""
+        return {
+            "xp": {str(i): x for i, x in self.xp_items()},
+            "epic": self.epic_links(),
+            "birthdays": self.birthdays(),
+        }
@@ -0,0 +1,249 @@
+# profiling.py
+# ======================
+# On-demand profiling + slow-operation tracing
+# ======================
+# - @profiled: wraps a command / loop body and records wall time and
+#   event-loop blocking time (time spent running synchronously between awaits)
+# - slow log: ring buffer of operations over threshold, with stacks
+# - LagMonitor: watchdog thread that pings the event loop and, when it
+#   doesn't answer in time, captures the loop thread's stack (catches sync
+#   work like save_json, feedparser.parse or the PIL render)
+# - cprofile_for / task_dump_for: N-second reports returned as text
+
+import io
+import sys
+import time
+import pstats
+import asyncio
+import cProfile
+import threading
+import functools
+import traceback
+from collections import Counter, deque
+
+SLOW_WALL_S = 2.0        # async op slower than this (wall time) is logged
+SLOW_BLOCK_S = 0.1       # op that blocked the loop longer than this is logged
+LAG_THRESHOLD_S = 0.25   # loop not answering a ping within this is flagged
+
+
+class OpStats:
+    __slots__ = ("calls", "errors", "wall", "blocking", "max_wall", "max_blocking")
+
+    def __init__(self):
+        self.calls = 0
+        self.errors = 0
+        self.wall = 0.0
+        self.blocking = 0.0
+        self.max_wall = 0.0
+        self.max_blocking = 0.0
+
+
+stats = {}                      # op name -> OpStats
+slow_log = deque(maxlen=200)    # recent slow operations / loop stalls
+
+
+def _record(name, wall, blocking, failed, stack=None):
+    s = stats.get(name)
+    if s is None:
+        s = stats[name] = OpStats()
+    s.calls += 1
+    s.errors += failed
+    s.wall += wall
+    s.blocking += blocking
+    s.max_wall = max(s.max_wall, wall)
+    s.max_blocking = max(s.max_blocking, blocking)
+    if wall >= SLOW_WALL_S or blocking >= SLOW_BLOCK_S:
+        slow_log.append({
+            "when": time.time(),
+            "name": name,
+            "wall": wall,
+            "blocking": blocking,
+            "stack": stack,
+        })
+
+
+def _await_chain(coro) -> str:
+    """Where a suspended coroutine (and whatever it awaits) is parked right now."""
+    lines = []
+    while coro is not None and getattr(coro, "cr_frame", None) is not None:
+        f = coro.cr_frame
+        lines.append(f'  File "{f.f_code.co_filename}", line {f.f_lineno}, in {f.f_code.co_name}\n')
+        coro = getattr(coro, "cr_await", None)
+    return "".join(lines)
+
+
+class _Timed:
+    """Awaitable that drives a coroutine step by step, timing each step."""
+
+    __slots__ = ("coro", "name")
+
+    def __init__(self, coro, name):
+        self.coro = coro
+        self.name = name
+
+    def __await__(self):
+        it = self.coro.__await__()
+        started = time.perf_counter()
+        blocking = 0.0
+        worst_step = 0.0
+        worst_stack = None
+        failed = 0
+        value, exc = None, None
+        try:
+            while True:
+                t0 = time.perf_counter()
+                try:
+                    if exc is not None:
+                        yielded = it.throw(exc)
+                    else:
+                        yielded = it.send(value)
+                except StopIteration as stop:
+                    return stop.value
+                finally:
+                    step = time.perf_counter() - t0
+                    blocking += step
+                    if step > worst_step and step >= SLOW_BLOCK_S:
+                        worst_step = step
+                        worst_stack = "next await after the blocking step:\n" + _await_chain(self.coro)
+                try:
+                    value, exc = (yield yielded), None
+                except GeneratorExit:
+                    it.close()
+                    raise
+                except BaseException as e:
+                    value, exc = None, e
+        except BaseException:
+            failed = 1
+            raise
+        finally:
+            _record(self.name, time.perf_counter() - started, blocking, failed, worst_stack)
+
+
+def profiled(fn=None, *, name=None):
+    """Decorator for async commands / loop bodies. Keeps the signature for discord.py."""
+    def wrap(func):
+        op = name or func.__name__
+
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            return await _Timed(func(*args, **kwargs), op)
+        return wrapper
+    return wrap(fn) if fn is not None else wrap
+
+
+def summary(top: int = 15) -> str:
+    rows = sorted(stats.items(), key=lambda kv: kv[1].wall, reverse=True)[:top]
+    lines = [f"{'operation':<24}{'calls':>7}{'err':>5}{'avg ms':>9}{'max ms':>9}{'block ms':>10}{'max blk':>9}"]
+    for op, s in rows:
+        lines.append(
+            f"{op[:23]:<24}{s.calls:>7}{s.errors:>5}{1000 * s.wall / s.calls:>9.1f}"
+            f"{1000 * s.max_wall:>9.1f}{1000 * s.blocking / s.calls:>10.2f}{1000 * s.max_blocking:>9.1f}"
+        )
+    return "\n".join(lines)
+
+
+def slow_report(limit: int = 50) -> str:
+    out = []
+    for entry in list(slow_log)[-limit:]:
+        stamp = time.strftime("%Y-%m-%d %H:%M:%S", time.gmtime(entry["when"]))
+        out.append(f"[{stamp} UTC] {entry['name']}: wall {1000 * entry['wall']:.0f} ms, "
+                   f"blocking {1000 * entry['blocking']:.0f} ms")
+        if entry["stack"]:
+            out.append(entry["stack"])
+    return "\n".join(out) or "No slow operations recorded."
+
+
+# ----------------------
+# Event-loop lag monitor
+# ----------------------
+class LagMonitor:
+    def __init__(self, interval: float = 0.5, threshold: float = LAG_THRESHOLD_S, on_lag=None):
+        self.interval = interval
+        self.threshold = threshold
+        self.on_lag = on_lag      # called from the watchdog thread: on_lag(lag_s, stack)
+        self.loop = None
+        self.loop_thread_id = None
+        self.max_lag = 0.0
+        self.stalls = 0
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self, loop: asyncio.AbstractEventLoop):
+        if self._thread and self._thread.is_alive():
+            return
+        self.loop = loop
+        self.loop_thread_id = threading.get_ident()
+        self._thread = threading.Thread(target=self._run, name="loop-lag-monitor", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            answered = threading.Event()
+            sent = time.perf_counter()
+            try:
+                self.loop.call_soon_threadsafe(answered.set)
+            except RuntimeError:
+                return   # loop closed
+            if answered.wait(self.threshold):
+                continue
+            # The loop is stuck in synchronous code right now: grab its stack
+            frame = sys._current_frames().get(self.loop_thread_id)
+            stack = "".join(traceback.format_stack(frame, limit=15)) if frame else None
+            answered.wait()
+            lag = time.perf_counter() - sent
+            self.stalls += 1
+            self.max_lag = max(self.max_lag, lag)
+            slow_log.append({"when": time.time(), "name": "event-loop stall",
+                             "wall": lag, "blocking": lag, "stack": stack})
+            if self.on_lag:
+                self.on_lag(lag, stack)
+
+
+# ----------------------
+# On-demand reports
+# ----------------------
+async def cprofile_for(seconds: float, sort: str = "cumulative", limit: int = 60) -> str:
+    """Profile everything the event loop runs for `seconds`."""
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        await asyncio.sleep(seconds)
+    finally:
+        profiler.disable()
+    out = io.StringIO()
+    pstats.Stats(profiler, stream=out).sort_stats(sort).print_stats(limit)
+    return out.getvalue()
+
+
+async def task_dump_for(seconds: float, every: float = 0.25) -> str:
+    """Sample where every asyncio task is suspended for `seconds`."""
+    me = asyncio.current_task()
+    samples = 0
+    where = Counter()
+    deadline = time.monotonic() + seconds
+    while time.monotonic() < deadline:
+        samples += 1
+        for task in asyncio.all_tasks():
+            if task is me:
+                continue
+            stack = task.get_stack(limit=1)
+            loc = f"{stack[-1].f_code.co_filename.rsplit('/', 1)[-1]}:{stack[-1].f_lineno} " \
+                  f"{stack[-1].f_code.co_name}" if stack else "<no frame>"
+            where[(task.get_name(), loc)] += 1
+        await asyncio.sleep(every)
+
+    lines = [f"{samples} samples over {seconds:.0f}s, {len(asyncio.all_tasks()) - 1} live tasks", ""]
+    for (task_name, loc), n in where.most_common(80):
+        lines.append(f"{100 * n / samples:5.0f}%  {task_name:<28} {loc}")
+    lines.append("")
+    lines.append("Current task stacks:")
+    for task in asyncio.all_tasks():
+        if task is me:
+            continue
+        buf = io.StringIO()
+        task.print_stack(limit=8, file=buf)
+        lines.append(buf.getvalue())
+    return "\n".join(lines)
@@ -0,0 +1,589 @@
+# replay_harness.py
+# ======================
+# Offline replay + load-testing harness
+# ======================
+# Runs the real bot code against:
+#   - a fake bot/guild/channel/member layer that records every send and role edit
+#   - a local aiohttp stub of fortnite-api.com (/v2/stats/br/v2, /v1/creative/creatorcode)
+#     with configurable latency, 429s and errors
+#   - a scenario runner replaying recorded (NDJSON) or synthetic event streams
+#     through on_message, on_reaction_add, commands and background loops
+# and reports throughput, API calls and outbound Discord calls per scenario.
+#
+# Usage:
+#   python replay_harness.py --scenario chat --users 200 --events 5000
+#   python replay_harness.py --scenario kd --users 500 --latency 0.05 --rate-limit 0.1
+#   python replay_harness.py --replay events.ndjson
+#
+# Synthetic events are spread over simulated time (--events-per-min across
+# the guild) and the XP guard reads that clock, so rate limits apply as they
+# would live. Recorded events may carry "at" (seconds from the start).
+#
+# Everything runs in a throwaway working directory, so no real state is touched.
+
+import os
+import sys
+import json
+import time
+import random
+import shutil
+import asyncio
+import inspect
+import itertools
+import argparse
+import tempfile
+from collections import Counter
+from types import SimpleNamespace
+
+import discord
+from aiohttp import web
+
+REPO_DIR = os.path.dirname(os.path.abspath(__file__))
+
+GUILD_ID = 1
+SYSTEM_CHANNEL_ID = 1140430213440876716   # hard-coded in main.py
+LOGS_CHANNEL_ID = 2
+LEADERBOARD_CHANNEL_ID = 3
+BIRTHDAY_CHANNEL_ID = 4
+GENERAL_CHANNEL_ID = 5
+
+
+# ----------------------
+# Fake Discord layer
+# ----------------------
+class Recorder:
+    """Counts every outbound Discord call the bot makes."""
+
+    def __init__(self):
+        self.calls = Counter()
+        self.sends_by_channel = Counter()
+
+    def record(self, kind, channel=None):
+        self.calls[kind] += 1
+        if channel is not None:
+            self.sends_by_channel[channel] += 1
+
+    @property
+    def total(self):
+        return sum(self.calls.values())
+
+
+class FakeAsset:
+    def __init__(self, url):
+        self.url = url
+
+
+class FakeRole:
+    def __init__(self, role_id, name, guild=None):
+        self.id = role_id
+        self.name = name
+        self.guild = guild
+
+    @property
+    def members(self):
+        if self.guild is None:
+            return []
+        return [m for m in self.guild.members if self in m.roles]
+
+    def __repr__(self):
+        return f"<FakeRole {self.name}>"
+
+
+class FakeMember:
+    def __init__(self, recorder, member_id, name, bot=False):
+        self._rec = recorder
+        self.id = member_id
+        self.name = name
+        self.display_name = name
+        self.bot = bot
+        self.guild = None
+        self.roles = []
+        self.mention = f"<@{member_id}>"
+        self.display_avatar = FakeAsset(f"https://cdn.example/avatars/{member_id}.png")
+
+    def __str__(self):
+        return self.name
+
+    async def add_roles(self, *roles, **_):
+        self._rec.record("add_roles")
+        for role in roles:
+            if role not in self.roles:
+                self.roles.append(role)
+
+    async def remove_roles(self, *roles, **_):
+        self._rec.record("remove_roles")
+        self.roles = [r for r in self.roles if r not in roles]
+
+    async def send(self, content=None, **_):
+        self._rec.record("dm")
+
+
+class FakeChannel:
+    def __init__(self, recorder, channel_id, name, guild):
+        self._rec = recorder
+        self.id = channel_id
+        self.name = name
+        self.guild = guild
+        self.sent = []
+        self.keep_messages = False
+        self.messages = {}   # id -> FakeMessage, for posts with a view (the bot may edit them later)
+
+    def __eq__(self, other):
+        return isinstance(other, FakeChannel) and other.id == self.id
+
+    def __hash__(self):
+        return hash(self.id)
+
+    async def send(self, content=None, **kwargs):
+        self._rec.record("send", self.name)
+        if self.keep_messages:
+            self.sent.append((content, kwargs))
+        msg = FakeMessage(None, self, content or "")
+        if kwargs.get("view") is not None:
+            self.messages[msg.id] = msg
+        return msg
+
+    async def fetch_message(self, message_id):
+        self._rec.record("fetch_message")
+        msg = self.messages.get(message_id)
+        if msg is None:
+            raise discord.NotFound(SimpleNamespace(status=404, reason="Not Found"), "Unknown Message")
+        return msg
+
+    def history(self, limit=None, oldest_first=False):
+        async def gen():
+            return
+            yield
+        return gen()
+
+
+class FakeGuild:
+    def __init__(self, recorder, guild_id=GUILD_ID):
+        self.id = guild_id
+        self._rec = recorder
+        self._members = {}
+        self._channels = {}
+        self.roles = []
+
+    @property
+    def members(self):
+        return list(self._members.values())
+
+    @property
+    def text_channels(self):
+        return list(self._channels.values())
+
+    def get_member(self, member_id):
+        return self._members.get(int(member_id))
+
+    async def fetch_member(self, member_id):
+        self._rec.record("fetch_member")
+        return self._members.get(int(member_id))
+
+    async def fetch_members(self, limit=None):
+        self._rec.record("fetch_members")
+        for member in list(self._members.values())[:limit]:
+            yield member
+
+    def add_member(self, member):
+        member.guild = self
+        self._members[member.id] = member
+
+    def add_channel(self, channel_id, name):
+        ch = FakeChannel(self._rec, channel_id, name, self)
+        self._channels[channel_id] = ch
+        return ch
+
+
+class FakeFollowup:
+    def __init__(self, ctx):
+        self._ctx = ctx
+
+    async def send(self, content=None, **kwargs):
+        await self._ctx.channel.send(content, **kwargs)
+
+
+class FakeContext:
+    def __init__(self, author, channel):
+        self.author = author
+        self.channel = channel
+        self.guild = channel.guild
+        self.interaction = None
+        self.followup = FakeFollowup(self)
+
+    async def send(self, content=None, **kwargs):
+        await self.channel.send(content, **kwargs)
+
+    async def reply(self, content=None, **kwargs):
+        await self.channel.send(content, **kwargs)
+
+
+class FakeMessage:
+    _ids = itertools.count(1)
+
+    def __init__(self, author, channel, content=""):
+        self.id = next(FakeMessage._ids)
+        self.author = author
+        self.channel = channel
+        self.guild = channel.guild
+        self.content = content
+        self.attachments = []
+        self.reactions = []
+
+    async def edit(self, content=None, **_):
+        self.channel._rec.record("edit")
+        if content is not None:
+            self.content = content
+
+
+class FakeReaction:
+    def __init__(self, message, emoji="🔥"):
+        self.message = message
+        self.emoji = emoji
+
+
+class FakeBot:
+    """
+    Stands in for main.bot for everything the bot code calls at runtime.
+    Prefix commands are dispatched to the real command callbacks.
+    """
+
+    def __init__(self, real_bot, guild, recorder):
+        self._real = real_bot
+        self.guilds = [guild]
+        self.recorder = recorder
+        self.user = FakeMember(recorder, 999, "SweeperLeader", bot=True)
+        self.command_prefix = "!"
+        self.command_errors = Counter()
+
+    def get_channel(self, channel_id):
+        for g in self.guilds:
+            ch = g._channels.get(channel_id)
+            if ch:
+                return ch
+        return None
+
+    def get_command(self, name):
+        return self._real.get_command(name)
+
+    async def wait_for(self, event, timeout=None, check=None):
+        raise asyncio.TimeoutError
+
+    async def process_commands(self, message):
+        if not message.content.startswith(self.command_prefix):
+            return
+        name, *args = message.content[len(self.command_prefix):].split()
+        await invoke_command(self, name, message.author, message.channel, args)
+
+
+async def invoke_command(fake_bot, name, author, channel, args):
+    cmd = fake_bot.get_command(name)
+    if cmd is None:
+        fake_bot.command_errors["unknown"] += 1
+        return
+    ctx = FakeContext(author, channel)
+    params = list(inspect.signature(cmd.callback).parameters.values())[1:]
+    converted, keywords = [], {}
+    for i, (param, raw) in enumerate(zip(params, args)):
+        if param.kind is inspect.Parameter.KEYWORD_ONLY:
+            keywords[param.name] = " ".join(args[i:])   # consume-rest, like discord.py
+            break
+        converted.append(int(raw) if param.annotation is int else raw)
+    try:
+        await cmd.callback(ctx, *converted, **keywords)
+    except Exception as e:
+        fake_bot.command_errors[type(e).__name__] += 1
+
+
+# ----------------------
+# fortnite-api.com stub
+# ----------------------
+class FortniteStub:
+    """Local imitation of the fortnite-api.com endpoints the bot uses."""
+
+    def __init__(self, latency=0.0, rate_limit=0.0, error_rate=0.0, seed=96):
+        self.latency = latency
+        self.rate_limit = rate_limit
+        self.error_rate = error_rate
+        self.rng = random.Random(seed)
+        self.calls = Counter()
+        self.statuses = Counter()
+        self.runner = None
+        self.base_url = None
+
+    async def _gate(self, route):
+        self.calls[route] += 1
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        roll = self.rng.random()
+        if roll < self.rate_limit:
+            self.statuses[429] += 1
+            return web.json_response({"status": 429, "error": "rate limited"}, status=429,
+                                     headers={"Retry-After": "1"})
+        if roll < self.rate_limit + self.error_rate:
+            self.statuses[500] += 1
+            return web.json_response({"status": 500, "error": "internal"}, status=500)
+        return None
+
+    def _player(self, key):
+        rng = random.Random(key)
+        matches = rng.randrange(50, 5000)
+        wins = rng.randrange(0, matches // 5)
+        kills = rng.randrange(matches // 2, matches * 4)
+        deaths = max(1, matches - wins)
+        return {
+            "kd": round(kills / deaths, 2),
+            "wins": wins,
+            "matches": matches,
+            "kills": kills,
+            "winRate": round(100 * wins / matches, 2),
+        }
+
+    async def stats(self, request):
+        blocked = await self._gate("stats")
+        if blocked:
+            return blocked
+        account_id = request.match_info.get("account_id")
+        # Account IDs are "id-<name>", so both endpoints describe the same player
+        key = account_id[3:] if account_id else request.query.get("name", "")
+        self.calls["stats_by_id" if account_id else "stats_by_name"] += 1
+        if key.startswith("missing"):
+            self.statuses[404] += 1
+            return web.json_response({"status": 404, "error": "the requested account does not exist"}, status=404)
+        self.statuses[200] += 1
+        return web.json_response({
+            "status": 200,
+            "data": {
+                "account": {"id": f"id-{key}", "name": key},
+                "stats": {"all": {"overall": self._player(key)}},
+            },
+        })
+
+    async def creatorcode(self, request):
+        blocked = await self._gate("creatorcode")
+        if blocked:
+            return blocked
+        creator = request.match_info["creator"]
+        self.statuses[200] += 1
+        return web.json_response({
+            "status": 200,
+            "data": [{"code": f"{creator}-{i:04d}", "title": f"Map {i}"} for i in range(3)],
+        })
+
+    async def start(self, host="127.0.0.1", port=0):
+        app = web.Application()
+        app.router.add_get("/v2/stats/br/v2", self.stats)
+        app.router.add_get("/v2/stats/br/v2/{account_id}", self.stats)
+        app.router.add_get("/v1/creative/creatorcode/{creator}", self.creatorcode)
+        self.runner = web.AppRunner(app, access_log=None)
+        await self.runner.setup()
+        site = web.TCPSite(self.runner, host, port)
+        await site.start()
+        port = site._server.sockets[0].getsockname()[1]
+        self.base_url = f"http://{host}:{port}"
+        return self.base_url
+
+    async def stop(self):
+        if self.runner:
+            await self.runner.cleanup()
+
+
+# ----------------------
+# Environment + bot import
+# ----------------------
+def load_bot(workdir, api_base):
+    """Import main.py inside `workdir` with env pointing at fake channels + the stub."""
+    os.environ.update({
+        "FORTNITE_API_KEY": "stub-key",
+        "FORTNITE_API_BASE": api_base,
+        "LOGS_CHANNEL": str(LOGS_CHANNEL_ID),
+        "LEADERBOARD_CHANNEL": str(LEADERBOARD_CHANNEL_ID),
+        "BIRTHDAY_CHANNEL": str(BIRTHDAY_CHANNEL_ID),
+        "QOTD_CHANNEL_ID": str(SYSTEM_CHANNEL_ID),
+    })
+    shutil.copy(os.path.join(REPO_DIR, "qotd.json"), workdir)
+    os.chdir(workdir)
+    if REPO_DIR not in sys.path:
+        sys.path.insert(0, REPO_DIR)
+    import main
+    return main
+
+
+def build_world(main, recorder, users):
+    guild = FakeGuild(recorder)
+    for ch_id, name in (
+        (SYSTEM_CHANNEL_ID, "system"), (LOGS_CHANNEL_ID, "logs"),
+        (LEADERBOARD_CHANNEL_ID, "leaderboard"), (BIRTHDAY_CHANNEL_ID, "birthdays"),
+        (GENERAL_CHANNEL_ID, "general"),
+    ):
+        guild.add_channel(ch_id, name)
+    names = ["The Cleaner", "Unranked"] + [name for _, name in (
+        (0, "Bronze I"), (100, "Bronze II"), (200, "Bronze III"), (400, "Silver I"),
+        (600, "Silver II"), (800, "Silver III"), (1200, "Gold I"), (1600, "Gold II"),
+        (2000, "Gold III"), (2600, "Platinum I"), (3200, "Platinum II"), (3800, "Platinum III"),
+        (4600, "Diamond I"), (5400, "Diamond II"), (6200, "Diamond III"), (7200, "Elite"),
+        (8500, "Champion"), (10000, "Unreal"))]
+    guild.roles = [FakeRole(i + 100, n, guild) for i, n in enumerate(names)]
+    for i in range(users):
+        guild.add_member(FakeMember(recorder, 10_000 + i, f"user{i}"))
+    fake = FakeBot(main.bot, guild, recorder)
+    main.bot = fake   # module globals resolve `bot` at call time
+    return fake
+
+
+# ----------------------
+# Scenarios
+# ----------------------
+class SimClock:
+    """Scenario time for the XP guard; events with "at" move it forward."""
+
+    def __init__(self):
+        self.start = time.time()
+        self.offset = 0.0
+
+    def advance_to(self, at):
+        self.offset = max(self.offset, float(at))
+
+    def __call__(self):
+        return self.start + self.offset
+
+
+def synthetic_chat(users, events, events_per_min=600, command_ratio=0.05, reaction_ratio=0.3,
+                   drain_every=100, seed=96):
+    rng = random.Random(seed)
+    commands = ["!rank", "!daily", "!ping", "!xpleaderboard"]
+    step = 60 / events_per_min
+    for i in range(events):
+        if drain_every and i and i % drain_every == 0:
+            yield {"type": "loop", "name": "drain_xp_queue"}
+        uid = 10_000 + rng.randrange(users)
+        roll = rng.random()
+        at = round(i * step, 3)
+        if roll < command_ratio:
+            yield {"type": "message", "user": uid, "channel": GENERAL_CHANNEL_ID,
+                   "content": rng.choice(commands), "at": at}
+        elif roll < command_ratio + reaction_ratio:
+            yield {"type": "reaction", "user": uid, "channel": GENERAL_CHANNEL_ID, "at": at}
+        else:
+            yield {"type": "message", "user": uid, "channel": GENERAL_CHANNEL_ID,
+                   "content": f"gg {rng.randrange(1000)}", "at": at}
+
+
+def synthetic_kd(users, events, events_per_min=600, seed=96):
+    rng = random.Random(seed)
+    step = 60 / events_per_min
+    for i in range(users):
+        name = f"missing{i}" if rng.random() < 0.05 else f"epic{i}"
+        yield {"type": "message", "user": 10_000 + i, "channel": GENERAL_CHANNEL_ID,
+               "content": f"!linkepic {name}", "at": round(i * step, 3)}
+    for _ in range(max(1, events // 100)):
+        yield {"type": "loop", "name": "refresh_kd_standings"}
+    yield {"type": "command", "name": "kdleaderboard", "user": 10_000, "channel": GENERAL_CHANNEL_ID}
+    yield {"type": "loop", "name": "autopost_leaderboard"}
+
+
+def recorded(path):
+    with open(path, "r") as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                yield json.loads(line)
+
+
+SCENARIOS = {"chat": synthetic_chat, "kd": synthetic_kd}
+
+
+async def dispatch(main, fake, event, counts):
+    kind = event["type"]
+    counts[kind] += 1
+    guild = fake.guilds[0]
+    if kind == "message":
+        author = guild.get_member(event["user"])
+        channel = fake.get_channel(event.get("channel", GENERAL_CHANNEL_ID))
+        await main.on_message(FakeMessage(author, channel, event.get("content", "")))
+    elif kind == "reaction":
+        author = guild.get_member(event["user"])
+        channel = fake.get_channel(event.get("channel", GENERAL_CHANNEL_ID))
+        await main.on_reaction_add(FakeReaction(FakeMessage(author, channel)), author)
+    elif kind == "command":
+        author = guild.get_member(event["user"])
+        channel = fake.get_channel(event.get("channel", GENERAL_CHANNEL_ID))
+        await invoke_command(fake, event["name"], author, channel, event.get("args", []))
+    elif kind == "loop":
+        target = getattr(main, event["name"])
+        await (target() if not hasattr(target, "coro") else target.coro())
+    elif kind == "sleep":
+        await asyncio.sleep(event.get("seconds", 0))
+
+
+async def run_scenario(events, users=200, latency=0.0, rate_limit=0.0, error_rate=0.0):
+    workdir = tempfile.mkdtemp(prefix="sweeper-replay-")
+    stub = FortniteStub(latency=latency, rate_limit=rate_limit, error_rate=error_rate)
+    base = await stub.start()
+    main = load_bot(workdir, base)
+    recorder = Recorder()
+    fake = build_world(main, recorder, users)
+    clock = SimClock()
+    if hasattr(main, "xp_guard"):
+        main.xp_guard.clock = clock
+
+    counts = Counter()
+    started = time.perf_counter()
+    try:
+        for event in events:
+            if "at" in event:
+                clock.advance_to(event["at"])
+            await dispatch(main, fake, event, counts)
+        if hasattr(main, "drain_xp_queue"):
+            await main.drain_xp_queue.coro()
+        # Let anything the bot queued in the background settle
+        await asyncio.sleep(0)
+    finally:
+        elapsed = time.perf_counter() - started
+        await stub.stop()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    total = sum(counts.values())
+    return {
+        "events": dict(counts),
+        "elapsed_s": round(elapsed, 3),
+        "simulated_s": round(clock.offset, 1),
+        "events_per_s": round(total / elapsed, 1) if elapsed else None,
+        "api_calls": dict(stub.calls),
+        "api_statuses": dict(stub.statuses),
+        "discord_calls": dict(recorder.calls),
+        "discord_sends_by_channel": dict(recorder.sends_by_channel),
+        "command_errors": dict(fake.command_errors),
+        "xp_dropped": dict(main.xp_guard.dropped) if hasattr(main, "xp_guard") else {},
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline replay / load test for SweeperLeader")
+    parser.add_argument("--scenario", choices=sorted(SCENARIOS), default="chat")
+    parser.add_argument("--replay", help="NDJSON file of recorded events (overrides --scenario)")
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--events", type=int, default=2000)
+    parser.add_argument("--events-per-min", type=float, default=600,
+                        help="simulated guild-wide event rate for synthetic scenarios")
+    parser.add_argument("--latency", type=float, default=0.0, help="stub API latency (s)")
+    parser.add_argument("--rate-limit", type=float, default=0.0, help="fraction of API calls answered 429")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of API calls answered 500")
+    args = parser.parse_args()
+
+    if args.replay:
+        events = recorded(os.path.abspath(args.replay))
+        label = os.path.basename(args.replay)
+    else:
+        events = SCENARIOS[args.scenario](args.users, args.events, events_per_min=args.events_per_min)
+        label = args.scenario
+
+    report = asyncio.run(run_scenario(
+        events, users=args.users, latency=args.latency,
+        rate_limit=args.rate_limit, error_rate=args.error_rate,
+    ))
+    print(json.dumps({"scenario": label, **report}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,360 @@
+# state_transfer.py
+# ======================
+# Streaming export / import of bot state (NDJSON, optionally gzipped)
+# ======================
+# One JSON record per line: a header, then members (XP, Epic link,
+# birthday, ...), tournaments and creator maps. Records are written and
+# applied one at a time, so neither side holds a second full copy of the
+# state. Imports validate every record and yield to the event loop every
+# chunk, but only persist the stores every COMMIT_INTERVAL seconds (and at
+# the end): each commit rewrites whole files, so committing per chunk made
+# large imports quadratic. A `<file>.progress` checkpoint records the last
+# committed line; records are idempotent, so a resume may safely re-apply
+# anything after it.
+#
+# CLI (run with the bot stopped, from the bot's working directory):
+#   python state_transfer.py export state.ndjson.gz
+#   python state_transfer.py import state.ndjson.gz --mode merge [--resume]
+#   python state_transfer.py import backup.json --mode merge      (legacy backup)
+
+import os
+import re
+import time
+import gzip
+import json
+import asyncio
+import argparse
+from datetime import date
+
+FORMAT_VERSION = 1
+CHUNK_SIZE = 500
+COMMIT_INTERVAL = 5.0   # seconds between store commits during an import
+DATE_RE = re.compile(r"^\d{4}-\d{2}-\d{2}$")
+
+MEMBER_FIELDS = ("xp", "epic", "epic_id", "birthday", "tz", "daily_claim")
+
+
+def _open(path, mode, compressed=None):
+    if compressed if compressed is not None else path.endswith(".gz"):
+        return gzip.open(path, mode + "t", encoding="utf-8", compresslevel=6)
+    return open(path, mode, encoding="utf-8")
+
+
+# ----------------------
+# Export
+# ----------------------
+def iter_export(members, tournaments, creator_maps: dict):
+    """
+    Yield export records one at a time. The async export yields to the
+    event loop between chunks, so the stores may gain or lose entries
+    meanwhile: walk a snapshot of the keys and skip anything since removed.
+    """
+    yield {"type": "header", "version": FORMAT_VERSION,
+           "members": len(members), "tournaments": len(tournaments)}
+    for mid in list(members.members):
+        m = members.members.get(mid)
+        if m is None or m.is_empty():
+            continue
+        rec = {"type": "member", "id": m.id}
+        for field in MEMBER_FIELDS:
+            value = getattr(m, field)
+            if value:
+                rec[field] = value
+        yield rec
+    for name in list(tournaments.tournaments):
+        t = tournaments.tournaments.get(name)
+        if t is None:
+            continue
+        # players/waitlist keep sign-up order (it decides waitlist promotion)
+        yield {"type": "tournament", "name": name, **t.to_dict()}
+    tracked = set(creator_maps.get("tracked", []))
+    posted = creator_maps.get("posted", {})
+    for creator in sorted(tracked | set(posted)):
+        yield {"type": "creator", "id": creator, "tracked": creator in tracked,
+               "posted": posted.get(creator, [])}
+
+
+def _export_steps(path, records, chunk):
+    tmp = path + ".tmp"
+    count = 0
+    with _open(tmp, "w", compressed=path.endswith(".gz")) as f:
+        for rec in records:
+            f.write(json.dumps(rec, separators=(",", ":")) + "\n")
+            count += 1
+            if count % chunk == 0:
+                yield count
+    os.replace(tmp, path)
+    yield count
+
+
+def export_state(path, members, tournaments, creator_maps, chunk=CHUNK_SIZE) -> int:
+    count = 0
+    for count in _export_steps(path, iter_export(members, tournaments, creator_maps), chunk):
+        pass
+    return count
+
+
+async def export_state_async(path, members, tournaments, creator_maps, chunk=CHUNK_SIZE) -> int:
+    """Same as export_state but yields to the event loop between chunks."""
+    count = 0
+    for count in _export_steps(path, iter_export(members, tournaments, creator_maps), chunk):
+        await asyncio.sleep(0)
+    return count
+
+
+# ----------------------
+# Import
+# ----------------------
+def iter_records(path):
+    """Yield (line_number, record). Legacy backup.json files are converted."""
+    if path.endswith(".json"):
+        yield from enumerate(_legacy_backup_records(path), start=1)
+        return
+    with _open(path, "r") as f:
+        for lineno, line in enumerate(f, start=1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                yield lineno, json.loads(line)
+            except json.JSONDecodeError as e:
+                yield lineno, {"type": "invalid", "error": str(e)}
+
+
+def _legacy_backup_records(path):
+    """backup.json is a single JSON document, so this one can't stream."""
+    with open(path, "r") as f:
+        blob = json.load(f)
+    yield {"type": "header", "version": FORMAT_VERSION, "legacy": True}
+    ids = set(blob.get("xp", {})) | set(blob.get("epic", {})) | set(blob.get("birthdays", {}))
+    for uid in ids:
+        rec = {"type": "member", "id": int(uid)}
+        if uid in blob.get("xp", {}):
+            rec["xp"] = blob["xp"][uid]
+        if uid in blob.get("epic", {}):
+            rec["epic"] = blob["epic"][uid]
+        if uid in blob.get("birthdays", {}):
+            rec["birthday"] = blob["birthdays"][uid]
+        yield rec
+    for name, players in blob.get("tournaments", {}).items():
+        yield {"type": "tournament", "name": name, "players": list(players)}
+    maps = blob.get("creator_maps", {})
+    for creator in set(maps.get("tracked", [])) | set(maps.get("posted", {})):
+        yield {"type": "creator", "id": creator, "tracked": creator in maps.get("tracked", []),
+               "posted": maps.get("posted", {}).get(creator, [])}
+
+
+def validate(rec) -> str | None:
+    """Return an error message, or None if the record is well-formed."""
+    if not isinstance(rec, dict):
+        return "not an object"
+    kind = rec.get("type")
+    if kind == "invalid":
+        return f"bad JSON: {rec.get('error')}"
+    if kind == "header":
+        if rec.get("version") != FORMAT_VERSION:
+            return f"unsupported version {rec.get('version')}"
+        return None
+    if kind == "member":
+        if not isinstance(rec.get("id"), int) or rec["id"] <= 0:
+            return "member id must be a positive integer"
+        if not isinstance(rec.get("xp", 0), int) or rec.get("xp", 0) < 0:
+            return "xp must be a non-negative integer"
+        for field in ("epic", "epic_id", "tz"):
+            if field in rec and not isinstance(rec[field], str):
+                return f"{field} must be a string"
+        if "birthday" in rec:
+            if not isinstance(rec["birthday"], str) or not DATE_RE.match(rec["birthday"]):
+                return "birthday must be YYYY-MM-DD"
+            try:
+                date.fromisoformat(rec["birthday"])
+            except ValueError:
+                return "birthday is not a real date"
+        if not isinstance(rec.get("daily_claim", 0), int):
+            return "daily_claim must be an integer day ordinal"
+        return None
+    if kind == "tournament":
+        if not isinstance(rec.get("name"), str) or not rec["name"]:
+            return "tournament name missing"
+        if not isinstance(rec.get("players"), list):
+            return "players must be a list"
+        if not isinstance(rec.get("waitlist", []), list):
+            return "waitlist must be a list"
+        capacity = rec.get("capacity")
+        if capacity is not None and (not isinstance(capacity, int) or capacity < 1):
+            return "capacity must be a positive integer"
+        return None
+    if kind == "creator":
+        if not isinstance(rec.get("id"), str) or not rec["id"]:
+            return "creator id missing"
+        if not isinstance(rec.get("posted", []), list):
+            return "posted must be a list"
+        return None
+    return f"unknown record type {kind!r}"
+
+
+def _apply_member(members, rec, mode):
+    m = members.ensure(rec["id"])
+    if mode == "replace":
+        for field in MEMBER_FIELDS:
+            setattr(m, field, rec.get(field) or (0 if field in ("xp", "daily_claim") else None))
+    else:
+        # Merge: highest XP wins; other fields only fill gaps
+        m.xp = max(m.xp, rec.get("xp", 0))
+        m.daily_claim = max(m.daily_claim, rec.get("daily_claim", 0))
+        for field in ("epic", "epic_id", "birthday", "tz"):
+            if not getattr(m, field) and rec.get(field):
+                setattr(m, field, rec[field])
+    members.dirty = True
+
+
+def _apply_tournament(tournaments, rec, mode):
+    tournaments.restore(rec["name"], rec, mode)
+
+
+def _apply_creator(creator_maps, rec, mode):
+    tracked = creator_maps.setdefault("tracked", [])
+    posted = creator_maps.setdefault("posted", {})
+    if rec.get("tracked") and rec["id"] not in tracked:
+        tracked.append(rec["id"])
+    if mode == "replace" or rec["id"] not in posted:
+        posted[rec["id"]] = list(rec.get("posted", []))
+    else:
+        seen = set(posted[rec["id"]])
+        posted[rec["id"]].extend(c for c in rec.get("posted", []) if c not in seen)
+
+
+class ImportResult:
+    __slots__ = ("applied", "skipped", "errors", "resumed_from")
+
+    def __init__(self):
+        self.applied = 0
+        self.skipped = 0
+        self.errors = []          # (line, message), capped
+        self.resumed_from = 0
+
+    def summary(self) -> str:
+        text = f"{self.applied} records applied, {len(self.errors)} rejected"
+        if self.resumed_from:
+            text += f" (resumed after line {self.resumed_from})"
+        return text
+
+
+def _progress_path(path):
+    return path + ".progress"
+
+
+def _import_steps(path, members, tournaments, creator_maps, mode, resume, chunk, commit, result,
+                  commit_interval=COMMIT_INTERVAL):
+    if mode not in ("merge", "replace"):
+        raise ValueError("mode must be 'merge' or 'replace'")
+    progress = _progress_path(path)
+    start_after = 0
+    if resume and os.path.exists(progress):
+        with open(progress, "r") as f:
+            start_after = int(f.read().strip() or 0)
+    result.resumed_from = start_after
+
+    pending = 0
+    last_line = start_after
+    last_commit = time.monotonic()
+    for lineno, rec in iter_records(path):
+        if lineno <= start_after:
+            continue
+        error = validate(rec)
+        if error:
+            if len(result.errors) < 100:
+                result.errors.append((lineno, error))
+            result.skipped += 1
+        elif rec["type"] == "member":
+            _apply_member(members, rec, mode)
+        elif rec["type"] == "tournament":
+            _apply_tournament(tournaments, rec, mode)
+        elif rec["type"] == "creator":
+            _apply_creator(creator_maps, rec, mode)
+        if not error and rec["type"] != "header":
+            result.applied += 1
+        last_line = lineno
+        pending += 1
+        if pending >= chunk:
+            pending = 0
+            if time.monotonic() - last_commit >= commit_interval:
+                commit()
+                with open(progress, "w") as f:
+                    f.write(str(last_line))
+                last_commit = time.monotonic()
+            yield last_line
+    commit()
+    if os.path.exists(progress):
+        os.remove(progress)
+    yield last_line
+
+
+def import_state(path, members, tournaments, creator_maps, commit, mode="merge",
+                 resume=False, chunk=CHUNK_SIZE, commit_interval=COMMIT_INTERVAL) -> ImportResult:
+    """
+    Apply an export file to live state. `commit()` must persist members,
+    tournaments and creator maps; it runs every `commit_interval` seconds
+    and once at the end.
+    """
+    result = ImportResult()
+    for _ in _import_steps(path, members, tournaments, creator_maps, mode, resume, chunk, commit, result,
+                           commit_interval):
+        pass
+    return result
+
+
+async def import_state_async(path, members, tournaments, creator_maps, commit, mode="merge",
+                             resume=False, chunk=CHUNK_SIZE, commit_interval=COMMIT_INTERVAL) -> ImportResult:
+    """Same as import_state but yields to the event loop between chunks."""
+    result = ImportResult()
+    for _ in _import_steps(path, members, tournaments, creator_maps, mode, resume, chunk, commit, result,
+                           commit_interval):
+        await asyncio.sleep(0)
+    return result
+
+
+# ----------------------
+# CLI
+# ----------------------
+def _cli():
+    from member_store import MemberStore
+    from storage import load_json, save_json
+    from tournament_engine import TournamentStore
+
+    parser = argparse.ArgumentParser(description="Export / import SweeperLeader state")
+    sub = parser.add_subparsers(dest="cmd", required=True)
+    exp = sub.add_parser("export", help="write state to NDJSON (.gz to compress)")
+    exp.add_argument("path")
+    imp = sub.add_parser("import", help="load state from an export or legacy backup.json")
+    imp.add_argument("path")
+    imp.add_argument("--mode", choices=("merge", "replace"), default="merge")
+    imp.add_argument("--resume", action="store_true", help="continue an interrupted import")
+    parser.add_argument("--members-file", default="data/members.json")
+    parser.add_argument("--tournament-file", default="data/tournaments.json")
+    parser.add_argument("--creator-file", default="creator_maps.json")
+    args = parser.parse_args()
+
+    members = MemberStore(args.members_file).load()
+    tournaments = TournamentStore(args.tournament_file).load()
+    creator_maps = load_json(args.creator_file, {"tracked": ["BritBoy96"], "posted": {}})
+
+    if args.cmd == "export":
+        n = export_state(args.path, members, tournaments, creator_maps)
+        print(f"Exported {n} records to {args.path}")
+        return
+
+    def commit():
+        members.flush()
+        tournaments.flush()
+        save_json(args.creator_file, creator_maps)
+
+    result = import_state(args.path, members, tournaments, creator_maps, commit,
+                          mode=args.mode, resume=args.resume)
+    print(result.summary())
+    for line, error in result.errors[:20]:
+        print(f"  line {line}: {error}")
+
+
+if __name__ == "__main__":
+    _cli()
@@ -0,0 +1,193 @@
+# stats_history.py
+# ======================
+# Compact time-series of fetched Fortnite stats
+# ======================
+# Every snapshot returned by fetch_fortnite_stats is appended as a fixed
+# 32-byte record to an append-only file. In memory each player gets
+# array-backed columns (ts, kd, wins, matches, kills, winRate), so weekly
+# deltas and trend sparklines are computed locally with no API calls.
+# compact() applies the retention policy and rewrites the file.
+
+import os
+import mmap
+import time
+import struct
+from array import array
+
+HISTORY_FILE = "data/stats_history.bin"
+
+# uid, ts, kd, wins, matches, kills, winRate
+RECORD = struct.Struct("<QIfIIIf")
+COLUMNS = ("ts", "kd", "wins", "matches", "kills", "winRate")
+TYPECODES = ("I", "f", "I", "I", "I", "f")
+
+DAY = 24 * 3600
+WEEK = 7 * DAY
+
+SPARK_CHARS = "▁▂▃▄▅▆▇█"
+
+
+class _Series:
+    __slots__ = COLUMNS
+
+    def __init__(self):
+        for name, code in zip(COLUMNS, TYPECODES):
+            setattr(self, name, array(code))
+
+    def append(self, row):
+        for name, value in zip(COLUMNS, row):
+            getattr(self, name).append(value)
+
+    def rows(self):
+        return zip(*(getattr(self, name) for name in COLUMNS))
+
+    def __len__(self):
+        return len(self.ts)
+
+
+class StatsHistory:
+    def __init__(self, path: str = HISTORY_FILE, full_res_days: int = 14,
+                 keep_days: int = 180, max_points: int = 400, min_gap: int = 3600):
+        self.path = path
+        self.full_res = full_res_days * DAY   # keep every snapshot this recent
+        self.keep = keep_days * DAY            # keep one per day up to this age
+        self.max_points = max_points           # hard cap per player
+        self.min_gap = min_gap                 # ignore repeat snapshots within this window
+        self.series = {}                       # int uid -> _Series
+        self.load()
+
+    # ---------- persistence ----------
+    def load(self):
+        self.series = {}
+        if not os.path.exists(self.path) or os.path.getsize(self.path) < RECORD.size:
+            return
+        with open(self.path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            usable = len(mm) - (len(mm) % RECORD.size)   # ignore a torn tail write
+            # Unpack straight from the mapping; slicing mm itself would copy the file
+            with memoryview(mm) as view, view[:usable] as records:
+                for uid, *row in RECORD.iter_unpack(records):
+                    self.series.setdefault(uid, _Series()).append(row)
+
+    def _ensure_dir(self):
+        folder = os.path.dirname(self.path)
+        if folder:
+            os.makedirs(folder, exist_ok=True)
+
+    # ---------- writes ----------
+    def record(self, uid, stats: dict, now: float | None = None) -> bool:
+        """Append one snapshot. Returns False if deduplicated."""
+        uid = int(uid)
+        ts = int(now if now is not None else time.time())
+        row = (
+            ts,
+            float(stats.get("kd", 0) or 0),
+            int(stats.get("wins", 0) or 0),
+            int(stats.get("matches", 0) or 0),
+            int(stats.get("kills", 0) or 0),
+            float(stats.get("winRate", 0.0) or 0.0),
+        )
+        s = self.series.setdefault(uid, _Series())
+        if len(s) and ts - s.ts[-1] < self.min_gap and s.matches[-1] == row[3]:
+            return False
+        s.append(row)
+        self._ensure_dir()
+        with open(self.path, "ab") as f:
+            f.write(RECORD.pack(uid, *row))
+        return True
+
+    def compact(self, now: float | None = None) -> int:
+        """
+        Retention + downsampling: keep everything newer than full_res_days,
+        the last snapshot of each day up to keep_days, drop the rest, and cap
+        each player at max_points. Rewrites the file; returns rows dropped.
+        """
+        now = int(now if now is not None else time.time())
+        dropped = 0
+        compacted = {}
+        for uid, s in self.series.items():
+            kept = []
+            last_day = None
+            for row in reversed(list(s.rows())):
+                age = now - row[0]
+                if age > self.keep:
+                    continue
+                if age > self.full_res:
+                    day = row[0] // DAY
+                    if day == last_day:
+                        continue
+                    last_day = day
+                kept.append(row)
+            kept = kept[: self.max_points]
+            dropped += len(s) - len(kept)
+            if kept:
+                ns = _Series()
+                for row in reversed(kept):
+                    ns.append(row)
+                compacted[uid] = ns
+        self.series = compacted
+
+        self._ensure_dir()
+        tmp = self.path + ".tmp"
+        with open(tmp, "wb") as f:
+            for uid, s in self.series.items():
+                f.write(b"".join(RECORD.pack(uid, *row) for row in s.rows()))
+        os.replace(tmp, self.path)
+        return dropped
+
+    # ---------- reads ----------
+    def latest(self, uid) -> dict | None:
+        s = self.series.get(int(uid))
+        if not s:
+            return None
+        row = {name: getattr(s, name)[-1] for name in COLUMNS}
+        row["kd"] = round(row["kd"], 2)
+        row["winRate"] = round(row["winRate"], 2)
+        return row
+
+    def delta(self, uid, window: int = WEEK, now: float | None = None) -> dict | None:
+        """
+        Change between the latest snapshot and the newest one at least
+        `window` seconds older (or the oldest available if none is).
+        """
+        s = self.series.get(int(uid))
+        if not s or len(s) < 2:
+            return None
+        now = now if now is not None else time.time()
+        cutoff = now - window
+        base = 0
+        for i in range(len(s) - 1, -1, -1):
+            if s.ts[i] <= cutoff:
+                base = i
+                break
+        if base == len(s) - 1:
+            return None
+        return {
+            "since": s.ts[base],
+            "kd": round(s.kd[-1] - s.kd[base], 2),
+            "wins": s.wins[-1] - s.wins[base],
+            "matches": s.matches[-1] - s.matches[base],
+            "kills": s.kills[-1] - s.kills[base],
+            "winRate": round(s.winRate[-1] - s.winRate[base], 2),
+        }
+
+    def sparkline(self, uid, column: str = "kd", points: int = 20) -> str:
+        s = self.series.get(int(uid))
+        if not s:
+            return ""
+        values = list(getattr(s, column)[-points:])
+        lo, hi = min(values), max(values)
+        if hi - lo < 1e-9:
+            return SPARK_CHARS[len(SPARK_CHARS) // 2] * len(values)
+        scale = (len(SPARK_CHARS) - 1) / (hi - lo)
+        return "".join(SPARK_CHARS[int((v - lo) * scale)] for v in values)
+
+    def climbers(self, n: int = 5, window: int = WEEK, min_matches: int = 1,
+                 now: float | None = None) -> list[tuple[int, dict]]:
+        """Biggest KD gains over `window` among players who actually played."""
+        gains = []
+        for uid in self.series:
+            d = self.delta(uid, window, now)
+            if d and d["matches"] >= min_matches and d["kd"] > 0:
+                gains.append((uid, d))
+        gains.sort(key=lambda x: (-x[1]["kd"], -x[1]["wins"]))
+        return gains[:n]
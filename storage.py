@@ -0,0 +1,27 @@
+# storage.py
+# ======================
+# Shared JSON file helpers
+# ======================
+# Every data file is written to `<path>.tmp` and swapped in with
+# os.replace, so a crash mid-write never leaves a truncated file behind.
+
+import os
+import json
+
+
+def load_json(path, fallback):
+    if not os.path.exists(path):
+        return fallback
+    with open(path, "r") as f:
+        return json.load(f)
+
+
+def save_json(path, data, indent=2, **dump_kwargs):
+    """Atomically write `data` as JSON (pass indent=None, separators=... for compact files)."""
+    folder = os.path.dirname(path)
+    if folder:
+        os.makedirs(folder, exist_ok=True)
+    tmp = path + ".tmp"
+    with open(tmp, "w") as f:
+        json.dump(data, f, indent=indent, **dump_kwargs)
+    os.replace(tmp, path)
@@ -0,0 +1,243 @@
+# tournament_engine.py
+# ======================
+# Tournament rosters, waitlists, seeding + results
+# ======================
+# Rosters and waitlists are insertion-ordered dicts used as ordered sets:
+# O(1) membership checks and removals while keeping sign-up order (which
+# decides waitlist promotion). Joins only mark the store dirty; a flush
+# loop writes the file, so a sign-up rush costs one write per flush
+# interval instead of one per join.
+#
+# data/tournaments.json used to map name -> [uid, ...]; that format is
+# still read, and rosters() returns it for backups and the JSON API.
+
+import os
+import json
+import heapq
+import time
+
+from storage import save_json
+
+TOURNAMENT_FILE = "data/tournaments.json"
+
+PLACEMENT_XP = (1000, 500, 250)   # 1st, 2nd, 3rd
+PLACED_XP = 100                   # any other reported placement
+PARTICIPATION_XP = 25             # rostered but not placed
+
+
+class Tournament:
+    __slots__ = ("name", "capacity", "squad_size", "players", "waitlist", "results")
+
+    def __init__(self, name: str, capacity: int | None = None, squad_size: int = 1):
+        self.name = name
+        self.capacity = capacity        # None = unlimited
+        self.squad_size = squad_size
+        self.players = {}               # uid -> None (ordered set)
+        self.waitlist = {}              # uid -> None (ordered set, FIFO)
+        self.results = []               # [{"at": ts, "placements": [[uid, ...], ...]}]
+
+    def is_full(self) -> bool:
+        return self.capacity is not None and len(self.players) >= self.capacity
+
+    def to_dict(self) -> dict:
+        data = {"players": list(self.players)}
+        if self.capacity is not None:
+            data["capacity"] = self.capacity
+        if self.squad_size != 1:
+            data["squad_size"] = self.squad_size
+        if self.waitlist:
+            data["waitlist"] = list(self.waitlist)
+        if self.results:
+            data["results"] = self.results
+        return data
+
+    @classmethod
+    def from_dict(cls, name: str, data) -> "Tournament":
+        if isinstance(data, list):          # legacy: name -> [uid, ...]
+            data = {"players": data}
+        t = cls(name, data.get("capacity"), data.get("squad_size", 1))
+        t.players = dict.fromkeys(str(p) for p in data.get("players", []))
+        t.waitlist = dict.fromkeys(str(p) for p in data.get("waitlist", []) if str(p) not in t.players)
+        t.results = data.get("results", [])
+        return t
+
+
+class TournamentStore:
+    def __init__(self, path: str = TOURNAMENT_FILE):
+        self.path = path
+        self.tournaments = {}   # name -> Tournament
+        self.dirty = False
+
+    def __len__(self):
+        return len(self.tournaments)
+
+    def __contains__(self, name):
+        return name in self.tournaments
+
+    def load(self):
+        if os.path.exists(self.path):
+            with open(self.path, "r") as f:
+                raw = json.load(f)
+            self.tournaments = {name: Tournament.from_dict(name, data) for name, data in raw.items()}
+        return self
+
+    def save(self):
+        save_json(self.path, {name: t.to_dict() for name, t in self.tournaments.items()},
+                  indent=None, separators=(",", ":"))
+        self.dirty = False
+
+    def flush(self):
+        if self.dirty:
+            self.save()
+
+    def get(self, name: str) -> Tournament | None:
+        return self.tournaments.get(name)
+
+    def ensure(self, name: str) -> Tournament:
+        t = self.tournaments.get(name)
+        if t is None:
+            t = self.tournaments[name] = Tournament(name)
+            self.dirty = True
+        return t
+
+    def create(self, name: str, capacity: int | None = None, squad_size: int = 1) -> Tournament:
+        """Create, or update the settings of an existing tournament."""
+        t = self.ensure(name)
+        t.capacity = capacity
+        t.squad_size = max(1, squad_size)
+        self._promote(t)
+        self.dirty = True
+        return t
+
+    # ---------- roster ----------
+    def join(self, name: str, uids) -> tuple[list, list, list]:
+        """Bulk join an existing tournament. Returns (joined, waitlisted, already_in)."""
+        t = self.tournaments[name]
+        joined, waitlisted, already = [], [], []
+        for uid in map(str, uids):
+            if uid in t.players or uid in t.waitlist:
+                already.append(uid)
+            elif t.is_full():
+                t.waitlist[uid] = None
+                waitlisted.append(uid)
+            else:
+                t.players[uid] = None
+                joined.append(uid)
+        if joined or waitlisted:
+            self.dirty = True
+        return joined, waitlisted, already
+
+    def leave(self, name: str, uids) -> tuple[list, list]:
+        """Bulk leave. Returns (removed, promoted_from_waitlist)."""
+        t = self.tournaments.get(name)
+        if t is None:
+            return [], []
+        removed = []
+        for uid in map(str, uids):
+            if uid in t.players:
+                del t.players[uid]
+            elif uid in t.waitlist:
+                del t.waitlist[uid]
+            else:
+                continue
+            removed.append(uid)
+        promoted = self._promote(t)
+        if removed:
+            self.dirty = True
+        return removed, promoted
+
+    def _promote(self, t: Tournament) -> list:
+        promoted = []
+        while t.waitlist and not t.is_full():
+            uid = next(iter(t.waitlist))
+            del t.waitlist[uid]
+            t.players[uid] = None
+            promoted.append(uid)
+        return promoted
+
+    def restore(self, name: str, data: dict, mode: str = "merge"):
+        """Apply an imported roster (see state_transfer)."""
+        incoming = Tournament.from_dict(name, data)
+        current = self.tournaments.get(name)
+        if mode == "replace" or current is None:
+            self.tournaments[name] = incoming
+        else:
+            if current.capacity is None:
+                current.capacity = incoming.capacity
+            current.players.update((p, None) for p in incoming.players)
+            current.waitlist.update((p, None) for p in incoming.waitlist if p not in current.players)
+        self.dirty = True
+
+    def rosters(self) -> dict:
+        """Legacy view: name -> [uid, ...]."""
+        return {name: list(t.players) for name, t in self.tournaments.items()}
+
+    # ---------- seeding ----------
+    @staticmethod
+    def seeded(t: Tournament, kd_of) -> list:
+        """Players by KD, best first; sign-up order breaks ties."""
+        order = {uid: i for i, uid in enumerate(t.players)}
+        return sorted(t.players, key=lambda uid: (-kd_of(uid), order[uid]))
+
+    def bracket(self, name: str, kd_of) -> list[tuple]:
+        """
+        First-round pairs in standard seed order (1 v N, 2 v N-1, ...), so
+        top seeds only meet late. Missing opponents are byes (None), which
+        go to the top seeds.
+        """
+        t = self.tournaments.get(name)
+        if t is None or not t.players:
+            return []
+        seeds = self.seeded(t, kd_of)
+        size = 2   # a lone player still gets a (player, bye) pair
+        while size < len(seeds):
+            size *= 2
+        order = [1]
+        while len(order) < size:
+            n = len(order) * 2
+            order = [s for seed in order for s in (seed, n + 1 - seed)]
+        slot = lambda s: seeds[s - 1] if s <= len(seeds) else None
+        return [(slot(order[i]), slot(order[i + 1])) for i in range(0, len(order), 2)]
+
+    def squads(self, name: str, kd_of, size: int | None = None) -> list[list]:
+        """
+        Balanced squads: strongest players first, each to the squad with the
+        lowest KD total that still has room.
+        """
+        t = self.tournaments.get(name)
+        if t is None or not t.players:
+            return []
+        size = max(1, size or t.squad_size)
+        count = -(-len(t.players) // size)
+        teams = [[] for _ in range(count)]
+        heap = [(0.0, i) for i in range(count)]   # (kd total, squad index)
+        for uid in self.seeded(t, kd_of):
+            total, i = heapq.heappop(heap)
+            teams[i].append(uid)
+            if len(teams[i]) < size:
+                heapq.heappush(heap, (total + kd_of(uid), i))
+        return teams
+
+    # ---------- results ----------
+    def report(self, name: str, placements: list[list], now: float | None = None,
+               override: bool = False) -> dict | None:
+        """
+        Record a result and return uid -> XP for everyone involved: placed
+        players by position, the rest of the roster a participation award.
+        Returns None if a result was already reported and `override` is not
+        set, so a repeated or retried report never pays out twice.
+        """
+        t = self.tournaments[name]
+        if t.results and not override:
+            return None
+        awards = {}
+        for pos, group in enumerate(placements):
+            xp = PLACEMENT_XP[pos] if pos < len(PLACEMENT_XP) else PLACED_XP
+            for uid in map(str, group):
+                awards.setdefault(uid, xp)
+        for uid in t.players:
+            awards.setdefault(uid, PARTICIPATION_XP)
+        t.results.append({"at": int(now if now is not None else time.time()),
+                          "placements": [[str(u) for u in g] for g in placements]})
+        self.dirty = True
+        return awards
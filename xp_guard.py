@@ -0,0 +1,181 @@
+# xp_guard.py
+# ======================
+# XP anti-abuse: per-user token buckets + duplicate detection
+# ======================
+# Every gateway XP event goes through XPGuard.check() before anything else
+# happens, so spam and reaction farming are rejected before they reach
+# the XP queue, the member store, role checks or the logs channel.
+#
+# Per-member state lives in a slot table: a dict maps (guild, member) to
+# a slot index into parallel typed arrays (tokens, last refill, and the
+# last hash + hash time for each event kind), about 48 bytes per member.
+# Messages and reactions keep separate hash slots, so chatting between
+# two identical reactions doesn't reset duplicate detection. Idle slots
+# are recycled through a free list.
+#
+# Limits (refill rate, burst, duplicate window, channel weights) are set
+# per guild and persisted; guilds without overrides use the defaults.
+
+import os
+import json
+import time
+import hashlib
+from array import array
+from collections import Counter
+
+from storage import save_json
+
+XP_LIMITS_FILE = "data/xp_limits.json"
+
+EVENT_KINDS = ("message", "reaction")   # each kind has its own duplicate slot
+
+
+class GuardLimits:
+    __slots__ = ("rate", "burst", "dup_window", "channel_weights")
+
+    def __init__(self, rate: float = 0.2, burst: float = 6, dup_window: float = 60,
+                 channel_weights: dict | None = None):
+        self.rate = rate                  # tokens (XP events) refilled per second
+        self.burst = burst                # bucket size
+        self.dup_window = dup_window      # seconds a repeated message earns nothing
+        self.channel_weights = channel_weights or {}   # channel id (str) -> XP weight, 0 = no XP
+
+    def to_dict(self) -> dict:
+        return {name: getattr(self, name) for name in self.__slots__}
+
+    @classmethod
+    def from_dict(cls, data: dict, default: "GuardLimits | None" = None) -> "GuardLimits":
+        base = default.to_dict() if default else {}
+        base.update({k: v for k, v in data.items() if k in cls.__slots__})
+        return cls(**base)
+
+
+def content_hash(text: str) -> int:
+    """64-bit hash of the message with case and whitespace normalised."""
+    norm = " ".join(text.lower().split())
+    return int.from_bytes(hashlib.blake2b(norm.encode("utf-8"), digest_size=8).digest(), "big")
+
+
+class XPGuard:
+    def __init__(self, path: str = XP_LIMITS_FILE, default: GuardLimits | None = None,
+                 max_slots: int = 50000):
+        self.path = path
+        self.default = default or GuardLimits()
+        self.guild_limits = {}      # guild id (str) -> GuardLimits
+        self.max_slots = max_slots
+        self.clock = time.time      # replaced by the replay harness's simulated clock
+        # slot table
+        self.slots = {}             # (guild id, member id) -> slot
+        self.free = []
+        self.tokens = array("d")
+        self.refilled = array("d")
+        self.last_hash = {kind: array("Q") for kind in EVENT_KINDS}
+        self.hashed_at = {kind: array("d") for kind in EVENT_KINDS}
+        # metrics
+        self.accepted = 0
+        self.dropped = Counter()    # reason -> events
+        self.load()
+
+    # ---------- config ----------
+    def load(self):
+        if os.path.exists(self.path):
+            with open(self.path, "r") as f:
+                raw = json.load(f)
+            self.guild_limits = {gid: GuardLimits.from_dict(data, self.default) for gid, data in raw.items()}
+
+    def save(self):
+        save_json(self.path, {gid: lim.to_dict() for gid, lim in self.guild_limits.items()})
+
+    def limits_for(self, guild_id) -> GuardLimits:
+        return self.guild_limits.get(str(guild_id), self.default)
+
+    def set_limits(self, guild_id, **changes) -> GuardLimits:
+        current = self.limits_for(guild_id)
+        limits = GuardLimits.from_dict({**current.to_dict(), **changes})
+        self.guild_limits[str(guild_id)] = limits
+        self.save()
+        return limits
+
+    def set_channel_weight(self, guild_id, channel_id, weight: float | None) -> GuardLimits:
+        weights = dict(self.limits_for(guild_id).channel_weights)
+        if weight is None or weight == 1:
+            weights.pop(str(channel_id), None)
+        else:
+            weights[str(channel_id)] = weight
+        return self.set_limits(guild_id, channel_weights=weights)
+
+    # ---------- slot table ----------
+    def _slot(self, key, burst: float, now: float) -> int:
+        slot = self.slots.get(key)
+        if slot is not None:
+            return slot
+        if not self.free and len(self.slots) >= self.max_slots:
+            self.prune(now)
+        if self.free:
+            slot = self.free.pop()
+            self.tokens[slot] = burst
+            self.refilled[slot] = now
+            for kind in EVENT_KINDS:
+                self.last_hash[kind][slot] = 0
+                self.hashed_at[kind][slot] = 0.0
+        else:
+            slot = len(self.tokens)
+            self.tokens.append(burst)
+            self.refilled.append(now)
+            for kind in EVENT_KINDS:
+                self.last_hash[kind].append(0)
+                self.hashed_at[kind].append(0.0)
+        self.slots[key] = slot
+        return slot
+
+    def prune(self, now: float | None = None, idle: float = 3600) -> int:
+        """Recycle slots of members idle for `idle` seconds (their bucket is full again)."""
+        now = now if now is not None else self.clock()
+        stale = [key for key, slot in self.slots.items() if now - self.refilled[slot] > idle]
+        for key in stale:
+            self.free.append(self.slots.pop(key))
+        return len(stale)
+
+    # ---------- check ----------
+    def check(self, guild_id, member_id, channel_id, content: str | None = None,
+              now: float | None = None, kind: str = "message") -> float:
+        """
+        Return the XP weight for this event, or 0 if it should be dropped.
+        `content` is compared only against the member's last event of the
+        same `kind`. Never awaits and never touches disk.
+        """
+        limits = self.limits_for(guild_id)
+        weight = limits.channel_weights.get(str(channel_id), 1) if limits.channel_weights else 1
+        if weight <= 0:
+            self.dropped["channel"] += 1
+            return 0
+        now = now if now is not None else self.clock()
+        slot = self._slot((guild_id, member_id), limits.burst, now)
+
+        if content:
+            h = content_hash(content)
+            last_hash, hashed_at = self.last_hash[kind], self.hashed_at[kind]
+            if h == last_hash[slot] and now - hashed_at[slot] < limits.dup_window:
+                self.dropped["duplicate"] += 1
+                return 0
+            last_hash[slot] = h
+            hashed_at[slot] = now
+
+        tokens = min(limits.burst, self.tokens[slot] + (now - self.refilled[slot]) * limits.rate)
+        self.refilled[slot] = now
+        if tokens < 1:
+            self.tokens[slot] = tokens
+            self.dropped["rate"] += 1
+            return 0
+        self.tokens[slot] = tokens - 1
+        self.accepted += 1
+        return weight
+
+    def report(self) -> str:
+        total = sum(self.dropped.values())
+        reasons = ", ".join(f"{k} {v}" for k, v in self.dropped.most_common()) or "none"
+        return (f"xp guard: {self.accepted} accepted, {total} dropped ({reasons}), "
+                f"{len(self.slots)} tracked members, {len(self.guild_limits)} guild overrides")
+
+    def __len__(self):
+        return len(self.slots)
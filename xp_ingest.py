@@ -0,0 +1,83 @@
+# xp_ingest.py
+# ======================
+# Micro-batched XP ingestion
+# ======================
+# Gateway handlers push XP events here instead of awaiting add_xp inline.
+# Events are folded into a per-user pending delta as they arrive (the XP
+# multiplier is applied at push time), so a burst of N messages from the
+# same user costs one dict update each and a single apply at drain time.
+# The consumer (a short tasks.loop in main.py) swaps the pending table and
+# applies each user's delta once per batch; what it applied is summed into
+# a window that main.py posts to the logs channel about once a minute.
+
+
+class PendingXP:
+    __slots__ = ("delta", "events", "channel", "member")
+
+    def __init__(self, channel, member=None):
+        self.delta = 0
+        self.events = 0
+        self.channel = channel   # last channel the user earned XP in
+        self.member = member     # discord.Member from the gateway event, saves a fetch
+
+
+class XPBatcher:
+    def __init__(self):
+        self.pending = {}     # user id -> PendingXP
+        # counters for /profile & the replay harness
+        self.events_in = 0
+        self.batches = 0
+        self.max_batch_users = 0
+        self.rank_errors = 0
+        # applied since the last summary post
+        self.window_xp = 0
+        self.window_events = 0
+        self.window_members = set()
+        self.window_errors = 0
+        self.last_error = None
+
+    def push(self, user_id: int, amount: int, multiplier: int = 1, channel=None, member=None):
+        """Record an XP event. Never awaits, never touches disk."""
+        p = self.pending.get(user_id)
+        if p is None:
+            p = self.pending[user_id] = PendingXP(channel, member)
+        p.delta += amount * multiplier
+        p.events += 1
+        if channel is not None:
+            p.channel = channel
+        if member is not None:
+            p.member = member
+        self.events_in += 1
+
+    def drain(self) -> dict:
+        """Take everything pending; new events go into a fresh table."""
+        batch, self.pending = self.pending, {}
+        if batch:
+            self.batches += 1
+            self.max_batch_users = max(self.max_batch_users, len(batch))
+        return batch
+
+    def applied(self, user_id: int, pending: PendingXP):
+        self.window_xp += pending.delta
+        self.window_events += pending.events
+        self.window_members.add(user_id)
+
+    def failed(self, error: Exception):
+        self.rank_errors += 1
+        self.window_errors += 1
+        self.last_error = error
+
+    def take_window(self) -> dict | None:
+        """Summary of everything applied since the last call, or None if idle."""
+        if not (self.window_events or self.window_errors):
+            return None
+        window = {"xp": self.window_xp, "events": self.window_events,
+                  "members": len(self.window_members), "errors": self.window_errors,
+                  "last_error": self.last_error}
+        self.window_xp = self.window_events = self.window_errors = 0
+        self.window_members = set()
+        self.last_error = None
+        return window
+
+    def __len__(self):
+        return len(self.pending)